@@ -0,0 +1,173 @@
+"""Measure decode and encode throughput of every characteristic codec.
+
+Run with ``python benchmarks/bench_codecs.py --output codecs.json`` and
+compare against an earlier run with ``--compare baseline.json``. Timings
+are compared relative to a reference workload, measured in the same run,
+so that runs on machines of different speed remain comparable.
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import timeit
+
+from gardena_bluetooth.parse import Characteristic, Service
+from gardena_bluetooth.simulator import sample_for
+
+
+def characteristics() -> list[tuple[str, Characteristic]]:
+    """All characteristics with the name of the service defining them."""
+    result: list[tuple[str, Characteristic]] = []
+    seen: set[int] = set()
+    for services in Service.registry.values():
+        for service in services:
+            for char in service.characteristics.values():
+                result.append((service.__name__, char))
+                seen.add(id(char))
+
+    for chars in Characteristic.registry.values():
+        for char in chars:
+            if id(char) not in seen:
+                result.append(("", char))
+    return result
+
+
+def _measure(fun, duration: float, repeat: int) -> float:
+    """Best time per call in nanoseconds, over repeated runs of duration."""
+    timer = timeit.Timer(fun)
+    number = 1
+    while (elapsed := timer.timeit(number)) < duration:
+        number *= 10 if elapsed < duration / 10 else 2
+    return min(elapsed, *timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+
+def run(duration: float = 0.01, repeat: int = 5) -> list[dict]:
+    results = []
+    for service_name, char in characteristics():
+        result = {
+            "service": service_name,
+            "characteristic": char.name,
+            "unique_id": char.unique_id,
+            "codec": type(char).__name__,
+            "decode_ns": None,
+            "encode_ns": None,
+        }
+        results.append(result)
+
+        if (sample := sample_for(char)) is None:
+            result["error"] = "no sample payload"
+            continue
+
+        try:
+            value = char.decode(sample)
+        except Exception as exc:
+            result["error"] = f"decode: {exc!r}"
+            continue
+        result["decode_ns"] = _measure(lambda: char.decode(sample), duration, repeat)
+
+        try:
+            char.encode(value)
+        except Exception as exc:
+            result["error"] = f"encode: {exc!r}"
+            continue
+        result["encode_ns"] = _measure(lambda: char.encode(value), duration, repeat)
+
+    return results
+
+
+def _revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _calibrate(duration: float, repeat: int) -> float:
+    """Time of a fixed reference workload, to normalize for machine speed."""
+    return _measure(
+        lambda: int.from_bytes(b"\x01\x02\x03\x04", "little"), duration, repeat
+    )
+
+
+def _compare(report: dict, baseline: dict, threshold: float) -> int:
+    scale = report["calibration_ns"] / baseline["calibration_ns"]
+    previous = {
+        (entry["service"], entry["unique_id"]): entry for entry in baseline["results"]
+    }
+    regressions = 0
+    for entry in report["results"]:
+        if (old := previous.get((entry["service"], entry["unique_id"]))) is None:
+            continue
+        for key in ("decode_ns", "encode_ns"):
+            if not entry[key] or not old[key]:
+                continue
+            ratio = entry[key] / old[key] / scale
+            if ratio > 1 + threshold:
+                regressions += 1
+                print(
+                    f"REGRESSION {entry['service']}.{entry['characteristic']} "
+                    f"{key}: {old[key]:.0f} -> {entry[key]:.0f} ns ({ratio:.2f}x)"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", help="write results as json to this file")
+    parser.add_argument("--compare", help="baseline json to compare results with")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="relative slowdown reported as regression",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=0.01,
+        help="seconds spent per timing run",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="number of timing runs, the best one is reported",
+    )
+    args = parser.parse_args()
+
+    results = run(args.duration, args.repeat)
+    report = {
+        "revision": _revision(),
+        "python": platform.python_version(),
+        "calibration_ns": _calibrate(args.duration, args.repeat),
+        "results": results,
+    }
+
+    for entry in results:
+        decode = f"{entry['decode_ns']:9.0f}" if entry["decode_ns"] else " " * 9
+        encode = f"{entry['encode_ns']:9.0f}" if entry["encode_ns"] else " " * 9
+        print(
+            f"{entry['service']:<22} {entry['characteristic']:<28} "
+            f"{decode} {encode} ns  {entry.get('error', '')}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+        if _compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
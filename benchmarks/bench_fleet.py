@@ -0,0 +1,79 @@
+"""Load test the client against fleets of simulated devices of growing size.
+
+Run with ``python benchmarks/bench_fleet.py --devices 40 100 200``. Each
+fleet runs the same per device workload, so the point where latency and
+event loop lag start to climb shows where the connection model saturates.
+
+The fault options inject connection failures, dropped links and lost
+notifications, to measure how fast the client recovers from them.
+"""
+
+import argparse
+import asyncio
+
+from gardena_bluetooth.loadtest import Workload, run_fleet, simulated_fleet
+from gardena_bluetooth.simulator import Faults
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--devices", type=int, nargs="+", default=[40, 100, 200])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument(
+        "--interval", type=float, default=1.0, help="Mean seconds between operations"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.03, help="Seconds per GATT operation"
+    )
+    parser.add_argument("--connect-latency", type=float, default=1.0)
+    parser.add_argument(
+        "--max-connections", type=int, help="Connection slots of the gateway"
+    )
+    parser.add_argument("--disconnect-delay", type=float, default=5.0)
+    parser.add_argument(
+        "--connect-error", type=float, default=0.0, help="Probability per connect"
+    )
+    parser.add_argument(
+        "--disconnect", type=float, default=0.0, help="Probability per operation"
+    )
+    parser.add_argument(
+        "--notification-drop",
+        type=float,
+        default=0.0,
+        help="Probability per notification",
+    )
+    parser.add_argument(
+        "--discovery-delay",
+        type=float,
+        default=0.0,
+        help="Seconds of service discovery per connect",
+    )
+    args = parser.parse_args()
+
+    faults = Faults(
+        connect_error=args.connect_error,
+        disconnect=args.disconnect,
+        notification_drop=args.notification_drop,
+        discovery_delay=args.discovery_delay,
+    )
+
+    workload = Workload(
+        duration=args.duration,
+        interval=args.interval,
+        disconnect_delay=args.disconnect_delay,
+        max_connections=args.max_connections,
+    )
+    for count in args.devices:
+        devices = simulated_fleet(
+            count,
+            latency=args.latency,
+            connect_latency=args.connect_latency,
+            faults=faults,
+        )
+        report = asyncio.run(run_fleet(devices, workload))
+        print(report.format())
+        print()
+
+
+if __name__ == "__main__":
+    main()
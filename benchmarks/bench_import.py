@@ -0,0 +1,44 @@
+"""Measure the cost of importing the package in a fresh interpreter.
+
+Run with ``python benchmarks/bench_import.py``.
+"""
+
+import statistics
+import subprocess
+import sys
+
+MODULES = [
+    "gardena_bluetooth",
+    "gardena_bluetooth.parse",
+    "gardena_bluetooth.const",
+    "gardena_bluetooth.client",
+    "gardena_bluetooth.scan",
+]
+ROUNDS = 10
+
+SCRIPT = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+
+def _measure(module: str) -> float:
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(module=module)],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return float(result.stdout)
+
+
+def main():
+    for module in MODULES:
+        timings = [_measure(module) for _ in range(ROUNDS)]
+        print(f"{module:<28} {statistics.median(timings) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
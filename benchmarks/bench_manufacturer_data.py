@@ -0,0 +1,62 @@
+"""Replay advertisement traffic through ManufacturerData.update.
+
+Run with ``python benchmarks/bench_manufacturer_data.py``.
+"""
+
+import random
+import time
+from unittest.mock import patch
+
+from gardena_bluetooth.parse import ManufacturerData, _decode_manufacturer_fields
+
+DEVICES = 60
+ADVERTISEMENTS = 200_000
+
+
+def _payloads(serial: int) -> list[bytes]:
+    """Segmented payloads as sent by a water control, rotating each interval."""
+    return [
+        bytes.fromhex("0205000406121001"),
+        bytes.fromhex("0504") + serial.to_bytes(4, "little"),
+        bytes.fromhex("02070d0205010208000209010406120001"),
+    ]
+
+
+def _traffic() -> list[tuple[int, bytes]]:
+    rng = random.Random(0)
+    devices = [_payloads(0x03C16200 + index) for index in range(DEVICES)]
+    return [
+        (index, rng.choice(devices[index]))
+        for index in (rng.randrange(DEVICES) for _ in range(ADVERTISEMENTS))
+    ]
+
+
+def _replay(traffic: list[tuple[int, bytes]]) -> float:
+    state = [ManufacturerData() for _ in range(DEVICES)]
+    start = time.perf_counter()
+    for index, payload in traffic:
+        state[index].update(payload)
+    return time.perf_counter() - start
+
+
+def main():
+    traffic = _traffic()
+
+    _decode_manufacturer_fields.cache_clear()
+    memoized = _replay(traffic)
+    info = _decode_manufacturer_fields.cache_info()
+
+    with patch(
+        "gardena_bluetooth.parse._decode_manufacturer_fields",
+        _decode_manufacturer_fields.__wrapped__,
+    ):
+        uncached = _replay(traffic)
+
+    print(f"advertisements: {len(traffic)} from {DEVICES} devices")
+    print(f"uncached: {len(traffic) / uncached:12.0f} updates/s")
+    print(f"memoized: {len(traffic) / memoized:12.0f} updates/s")
+    print(f"cache:    {info.hits} hits, {info.misses} misses")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Measure notification dispatch throughput.
+
+Run with ``python benchmarks/bench_notifications.py``.
+"""
+
+import time
+from types import SimpleNamespace
+
+from gardena_bluetooth.client import NotificationDispatcher
+from gardena_bluetooth.const import EventHistory, Valve1
+
+NOTIFICATIONS = 500_000
+
+
+def _payloads():
+    return [
+        (
+            SimpleNamespace(handle=20, uuid=Valve1.remaining_time_open.uuid),
+            Valve1.remaining_time_open,
+            bytearray((1200).to_bytes(4, "little")),
+        ),
+        (
+            SimpleNamespace(handle=32, uuid=EventHistory.history.uuid),
+            EventHistory.history,
+            bytearray(bytes.fromhex("0105a0b1c3650200102e0000")),
+        ),
+    ]
+
+
+def main():
+    for gatt_char, char, data in _payloads():
+        dispatcher = NotificationDispatcher()
+        received = []
+        dispatcher.add(gatt_char.handle, char, received.append)
+        dispatcher.add(gatt_char.handle + 1, char, received.append)
+
+        start = time.perf_counter()
+        for _ in range(NOTIFICATIONS):
+            dispatcher(gatt_char, data)
+        elapsed = time.perf_counter() - start
+
+        assert len(received) == NOTIFICATIONS
+        print(f"{char.name:<20} {NOTIFICATIONS / elapsed:12.0f} notifications/s")
+
+
+if __name__ == "__main__":
+    main()
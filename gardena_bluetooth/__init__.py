@@ -1,27 +1,36 @@
 from __future__ import annotations
 
-from bleak.uuids import register_uuids
-
-from .const import ScanService
-from .parse import Characteristic, Service
+from functools import cache
 
 
 def prefix(name: str) -> str:
     return f"Gardena {name}"
 
 
-register_uuids(
-    {
-        uuid: prefix(", ".join(service.__name__ for service in services))
-        for uuid, services in Service.registry.items()
-    }
-)
+@cache
+def register_uuid_names() -> None:
+    """Register names of known services and characteristics with bleak.
+
+    This is done on first use rather than on import, so that the codecs in
+    ``parse`` and ``const`` can be used without importing bleak.
+    """
+    from bleak.uuids import register_uuids
+
+    from .const import ScanService
+    from .parse import Characteristic, Service
+
+    register_uuids(
+        {
+            uuid: prefix(", ".join(service.__name__ for service in services))
+            for uuid, services in Service.registry.items()
+        }
+    )
 
-register_uuids(
-    {
-        uuid: prefix(", ".join(char.name for char in chars))
-        for uuid, chars in Characteristic.registry.items()
-    }
-)
+    register_uuids(
+        {
+            uuid: prefix(", ".join(char.name for char in chars))
+            for uuid, chars in Characteristic.registry.items()
+        }
+    )
 
-register_uuids({ScanService: "Husqvarna"})
+    register_uuids({ScanService: "Husqvarna"})
@@ -1,33 +1,189 @@
 import asyncio
+import contextlib
+import dataclasses
+import json
+import time
+from collections.abc import AsyncGenerator, Collection, Iterator
+from datetime import date, datetime, timedelta
+from datetime import time as dt_time
+from enum import Enum
 from functools import partial
+from typing import IO, TYPE_CHECKING, Any
 
 import asyncclick as click
 from bleak import (
     BleakClient,
     BleakError,
+    BLEDevice,
 )
 from bleak.backends.characteristic import BleakGATTCharacteristic
 from bleak.uuids import uuidstr_to_str
 
-from .parse import Characteristic, CharacteristicBytes, ManufacturerData, Service
-from .scan import async_get_devices, async_scan_devices
+from . import register_uuid_names
+from .client import DEFAULT_DELAY, CachedConnection, Client
+from .const import ScanService
+from .parse import (
+    Characteristic,
+    CharacteristicBytes,
+    ManufacturerData,
+    ProductType,
+    Service,
+)
+from .scan import (
+    DeviceProgress,
+    ScanOptions,
+    advertisement_queue,
+    async_get_devices,
+    async_scan_devices,
+)
+
+if TYPE_CHECKING:
+    from .cache import ManufacturerDataCache
 
 IGNORED_NOTIFY_UUIDS = {
     # SMP
     "da2e7828-fbce-4e01-ae9e-261174997c48"
 }
 
+DEFAULT_PARALLEL = 3
+RECONNECT_DELAY = 5.0
+
+
+cache_option = click.option(
+    "--cache",
+    type=click.Path(dir_okay=False),
+    help="File keeping manufacturer data of known devices, to skip the scan.",
+)
+
+
+def _load_cache(cache_path: str | None) -> "ManufacturerDataCache | None":
+    if cache_path is None:
+        return None
+    from .cache import ManufacturerDataCache
+
+    cache = ManufacturerDataCache(cache_path)
+    cache.load()
+    return cache
+
+
+async def _detect(
+    address: str, cache_path: str | None
+) -> tuple[BLEDevice | str, ManufacturerData]:
+    cache = _load_cache(cache_path)
+    if cache is not None and (manufacturer_data := cache.get(address)) is not None:
+        return address, manufacturer_data
+    return await _detect_device(address, cache)
+
+
+async def _detect_device(
+    address: str, cache: "ManufacturerDataCache | None"
+) -> tuple[BLEDevice, ManufacturerData]:
+    """Wait for the device, which the cache lets complete on first sight."""
+    try:
+        devices = await async_get_devices({address}, cache=cache)
+    except TimeoutError as exc:
+        raise click.ClickException(str(exc)) from exc
+    if cache is not None:
+        cache.save()
+    device = devices[address]
+    return device.ble_device, device.manufacturer_data
+
+
+async def _detect_each(
+    addresses: Collection[str], cache_path: str | None
+) -> AsyncGenerator[tuple[str, BLEDevice | str, ManufacturerData]]:
+    """Yield each device as soon as its product type is known."""
+    pending = set(addresses)
+    cache = _load_cache(cache_path)
+    if cache is not None:
+        for address in addresses:
+            if (manufacturer_data := cache.get(address)) is not None:
+                pending.discard(address)
+                yield address, address, manufacturer_data
+
+    async with DeviceProgress(pending, cache=cache) as progress:
+        async for result in progress:
+            address = result.ble_device.address
+            yield address, result.ble_device, result.manufacturer_data
+
+    if cache is not None:
+        cache.save()
+    for address in sorted(progress.pending):
+        _emit(address, "Not detected", err=True)
+
+
+def _emit(address: str, message: str, err: bool = False) -> None:
+    """Print an event of a device, prefixed with the time and address."""
+    timestamp = datetime.now().isoformat(timespec="milliseconds")
+    click.echo(f"{timestamp} {address} {message}", err=err)
+
+
+def _json_value(value: Any) -> Any:
+    """Convert parsed characteristic values for JSON output.
+
+    Done before encoding, since json writes enums deriving from int as
+    plain numbers without consulting a default hook.
+    """
+    if isinstance(value, Enum):
+        return value.name
+    if value is None or isinstance(value, bool | int | float | str):
+        return value
+    if isinstance(value, datetime | date | dt_time):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, bytes | bytearray):
+        return value.hex()
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return {
+            field.name: _json_value(getattr(value, field.name))
+            for field in dataclasses.fields(value)
+        }
+    if isinstance(value, dict):
+        return {str(_json_value(key)): _json_value(item) for key, item in value.items()}
+    if isinstance(value, set | frozenset):
+        return [_json_value(item) for item in sorted(value)]
+    if isinstance(value, list | tuple):
+        return [_json_value(item) for item in value]
+    return repr(value)
+
+
+def _gatt_chars(
+    client: BleakClient, product_type: ProductType
+) -> Iterator[tuple[str, BleakGATTCharacteristic, Characteristic]]:
+    """Characteristics of a connected device, with service name and parser."""
+    for service in client.services:
+        service_parser = Service.find_service(service.uuid, product_type)
+        service_name = service_parser.__name__ if service_parser else service.uuid
+
+        for char in service.characteristics:
+            char_parser = None
+            if service_parser:
+                char_parser = service_parser.characteristics.get(char.uuid)
+            if char_parser is None:
+                char_parser = CharacteristicBytes(char.uuid, name=char.uuid)
+            yield service_name, char, char_parser
+
 
 @click.group()
 async def main():
-    pass
+    register_uuid_names()
 
 
 @main.command()
-async def scan():
+@click.option("--passive", is_flag=True, help="Scan without requesting scan responses.")
+@click.option(
+    "--service-filter",
+    is_flag=True,
+    help="Only report devices advertising the scan service.",
+)
+async def scan(passive: bool, service_filter: bool):
     click.echo("Scanning for devices")
 
-    async for data in async_scan_devices():
+    options = ScanOptions(
+        passive=passive, service_uuids=(ScanService,) if service_filter else None
+    )
+    async for data in async_scan_devices(options=options):
         advertisement = data.advertisement
         device = data.ble_device
         manufacturer_data = data.manufacturer_data
@@ -43,20 +199,40 @@ async def scan():
         click.echo()
 
 
+@main.command()
+@click.argument("path", type=click.Path(dir_okay=False))
+@click.option(
+    "--duration", type=float, help="Seconds to capture, until interrupted by default."
+)
+async def capture(path: str, duration: float | None):
+    from .capture import CaptureWriter
+
+    click.echo(f"Capturing advertisements to: {path}")
+
+    with CaptureWriter(path) as writer:
+        with contextlib.suppress(TimeoutError):
+            async with asyncio.timeout(duration):
+                async with advertisement_queue(maxsize=0) as queue:
+                    while True:
+                        writer(*await queue.get())
+
+    click.echo(f"Captured {writer.count} advertisements")
+
+
 @main.command()
 @click.argument("address")
-async def connect(address: str):
+@cache_option
+async def connect(address: str, cache: str | None):
     click.echo(f"Detecting: {address}")
 
-    devices = await async_get_devices({address})
-    device = devices[address]
-    product_type = device.manufacturer_data.product_type
+    device, manufacturer_data = await _detect(address, cache)
+    product_type = manufacturer_data.product_type
 
-    click.echo(f"Advertised data: {device.manufacturer_data}")
+    click.echo(f"Advertised data: {manufacturer_data}")
     click.echo(f"Product type: {product_type}")
 
     click.echo(f"Connecting to: {address}")
-    async with BleakClient(device.ble_device, timeout=20) as client:
+    async with BleakClient(device, timeout=20) as client:
         for service in client.services:
             service_parser = Service.find_service(service.uuid, product_type)
 
@@ -87,15 +263,12 @@ async def connect(address: str):
                         click.echo(f"    Data: {char_parser.decode(data)!r}")
 
 
-@main.command()
-@click.argument("address")
-async def monitor(address: str):
-    click.echo(f"Detecting: {address}")
-
-    devices = await async_get_devices({address})
-    device = devices[address]
-    product_type = device.manufacturer_data.product_type
-
+async def _monitor_device(
+    address: str,
+    device: BLEDevice | str,
+    product_type: ProductType,
+    slots: asyncio.Semaphore,
+):
     def _char_callback(
         service_name: str,
         char_parser: Characteristic,
@@ -104,16 +277,15 @@ async def monitor(address: str):
     ):
         try:
             value = char_parser.decode(data)
-        except ValueError:
-            click.echo(
-                "%s.%s failed to decode %s with char parser %s",
-                service_name,
-                char_parser.name,
-                data,
-                char_parser,
+        except Exception as exc:
+            _emit(
+                address,
+                f"{service_name}.{char_parser.name}: "
+                f"Failed to decode {data.hex()} - {exc!r}",
                 err=True,
             )
-        click.echo(f"{service_name}.{char_parser.name}: {value!r}")
+            return
+        _emit(address, f"{service_name}.{char_parser.name}: {value!r}")
 
     async def _char_read(
         client: BleakClient,
@@ -122,38 +294,235 @@ async def monitor(address: str):
         service_name: str,
     ):
         try:
-            data = await client.read_gatt_char(char.uuid)
+            data = await client.read_gatt_char(gatt_char)
         except BleakError as exc:
-            click.echo(
-                f"{service_name}.{char_parser.name}: Failed - {repr(exc)}",
+            _emit(
+                address,
+                f"{service_name}.{char_parser.name}: Failed - {exc!r}",
                 err=True,
             )
             return
         _char_callback(service_name, char_parser, gatt_char, data)
 
-    click.echo(f"Connecting: {address}")
-    async with BleakClient(device.ble_device, timeout=20) as client:
-        for service in client.services:
-            service_parser = Service.find_service(service.uuid, product_type)
-            service_name = service_parser.__name__ if service_parser else service.uuid
+    while True:
+        disconnected = asyncio.Event()
+        client = BleakClient(
+            device, timeout=20, disconnected_callback=lambda _: disconnected.set()
+        )
+        try:
+            # Only connecting and subscribing is limited, monitoring is not
+            async with slots:
+                _emit(address, "Connecting")
+                await client.connect()
+                chars = list(_gatt_chars(client, product_type))
+                await asyncio.gather(
+                    *(
+                        _char_read(client, char, char_parser, service_name)
+                        for service_name, char, char_parser in chars
+                        if "read" in char.properties
+                    )
+                )
+                for service_name, char, char_parser in chars:
+                    if "notify" in char.properties:
+                        await client.start_notify(
+                            char, partial(_char_callback, service_name, char_parser)
+                        )
+            _emit(address, "Monitoring")
+            await disconnected.wait()
+            _emit(address, "Disconnected", err=True)
+        except (BleakError, TimeoutError) as exc:
+            _emit(address, f"Failed - {exc!r}", err=True)
+        except Exception as exc:
+            _emit(address, f"Unexpected error - {exc!r}", err=True)
+        finally:
+            with contextlib.suppress(Exception):
+                await client.disconnect()
+        await asyncio.sleep(RECONNECT_DELAY)
 
-            for char in service.characteristics:
-                char_parser = None
-                if service_parser:
-                    char_parser = service_parser.characteristics.get(char.uuid)
-                if char_parser is None:
-                    char_parser = CharacteristicBytes(char.uuid, name=char.uuid)
 
-                if "read" in char.properties:
-                    await _char_read(client, char, char_parser, service_name)
+@main.command()
+@click.argument("addresses", nargs=-1, required=True)
+@click.option(
+    "--parallel",
+    default=DEFAULT_PARALLEL,
+    show_default=True,
+    help="Devices to connect and subscribe to at the same time.",
+)
+@cache_option
+async def monitor(addresses: tuple[str, ...], parallel: int, cache: str | None):
+    click.echo(f"Detecting: {', '.join(addresses)}")
+
+    slots = asyncio.Semaphore(parallel)
+    async with asyncio.TaskGroup() as tasks:
+        async for address, device, manufacturer_data in _detect_each(addresses, cache):
+            product_type = manufacturer_data.product_type
+            _emit(address, f"Detected {product_type}")
+            tasks.create_task(_monitor_device(address, device, product_type, slots))
+
+
+async def _dump_device(
+    address: str,
+    device: BLEDevice | str,
+    product_type: ProductType,
+    slots: asyncio.Semaphore,
+    output: IO[str],
+):
+    def _write(record: dict[str, Any]):
+        try:
+            line = json.dumps(_json_value(record))
+        except (TypeError, ValueError) as exc:
+            record.pop("value", None)
+            record["error"] = repr(exc)
+            line = json.dumps(_json_value(record))
+        output.write(line + "\n")
+
+    async def _dump_char(
+        client: BleakClient,
+        gatt_char: BleakGATTCharacteristic,
+        char_parser: Characteristic,
+        service_name: str,
+    ):
+        record: dict[str, Any] = {
+            "address": address,
+            "service": service_name,
+            "uuid": gatt_char.uuid,
+            "name": char_parser.name,
+        }
+        start = time.perf_counter()
+        try:
+            data = await client.read_gatt_char(gatt_char)
+        except Exception as exc:
+            record["error"] = repr(exc)
+            _write(record)
+            return
+        record["latency"] = round(time.perf_counter() - start, 6)
+        record["raw"] = data.hex()
+        try:
+            record["value"] = char_parser.decode(data)
+        except Exception as exc:
+            record["error"] = repr(exc)
+        _write(record)
 
-                if "notify" in char.properties:
-                    await client.start_notify(
-                        char, partial(_char_callback, service_name, char_parser)
+    async with slots:
+        _emit(address, "Connecting", err=True)
+        try:
+            async with BleakClient(device, timeout=20) as client:
+                await asyncio.gather(
+                    *(
+                        _dump_char(client, char, char_parser, service_name)
+                        for service_name, char, char_parser in _gatt_chars(
+                            client, product_type
+                        )
+                        if "read" in char.properties
                     )
+                )
+        except Exception as exc:
+            _emit(address, f"Failed - {exc!r}", err=True)
+            return
+    _emit(address, "Done", err=True)
 
-        while True:
-            await asyncio.sleep(1)
+
+@main.command()
+@click.argument("addresses", nargs=-1, required=True)
+@click.option(
+    "--output",
+    type=click.File("w"),
+    default="-",
+    help="File to write records to, standard output by default.",
+)
+@click.option(
+    "--parallel",
+    default=DEFAULT_PARALLEL,
+    show_default=True,
+    help="Devices to connect to at the same time.",
+)
+@cache_option
+async def dump(
+    addresses: tuple[str, ...], output: IO[str], parallel: int, cache: str | None
+):
+    slots = asyncio.Semaphore(parallel)
+    async with asyncio.TaskGroup() as tasks:
+        async for address, device, manufacturer_data in _detect_each(addresses, cache):
+            product_type = manufacturer_data.product_type
+            tasks.create_task(
+                _dump_device(address, device, product_type, slots, output)
+            )
+
+
+@main.command()
+@click.argument("address", required=False)
+@click.option(
+    "--simulate",
+    type=click.Choice([product_type.name for product_type in ProductType][1:]),
+    help="Run against a simulated device of a product type instead.",
+)
+@click.option("--cycles", default=20, show_default=True)
+@click.option(
+    "--keep-connection",
+    is_flag=True,
+    help="Connect once, instead of for every cycle.",
+)
+@click.option(
+    "--write",
+    is_flag=True,
+    help="Write back the value read of a setting of the device.",
+)
+@click.option(
+    "--latency",
+    default=0.03,
+    show_default=True,
+    help="Seconds per operation of the simulated device.",
+)
+@cache_option
+async def bench(
+    address: str | None,
+    simulate: str | None,
+    cycles: int,
+    keep_connection: bool,
+    write: bool,
+    latency: float,
+    cache: str | None,
+):
+    from .loadtest import run_bench
+
+    if simulate is not None:
+        from .simulator import SimulatedDevice, connect_simulated, sample_for
+
+        simulated = SimulatedDevice(
+            address or "00:00:00:00:00:01",
+            ProductType[simulate],
+            latency=latency,
+            connect_latency=latency * 10,
+        )
+        device = simulated.ble_device
+        product_type = simulated.product_type
+        connection = CachedConnection(
+            DEFAULT_DELAY, lambda: device, connector=connect_simulated
+        )
+
+        def trigger(char: Characteristic):
+            simulated.set_value(char.uuid, sample_for(char) or b"\x00")
+
+    elif address is not None:
+        click.echo(f"Detecting: {address}")
+        device, manufacturer_data = await _detect_device(address, _load_cache(cache))
+        product_type = manufacturer_data.product_type
+        connection = CachedConnection(DEFAULT_DELAY, lambda: device)
+        trigger = None
+    else:
+        raise click.UsageError("Give an address, or a product type to --simulate")
+
+    click.echo(f"Benchmarking {product_type} at {device.address}")
+    report = await run_bench(
+        connection,
+        Client(connection, product_type),
+        product_type,
+        cycles=cycles,
+        reconnect=not keep_connection,
+        write=write,
+        trigger=trigger,
+    )
+    click.echo(report.format())
 
 
 @main.command()
@@ -0,0 +1,123 @@
+import logging
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+
+from bleak import BleakClient, BLEDevice
+
+from .client import CachedConnection
+from .scan import AdapterSighting, ScannerHub
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CONNECTION_SLOTS = 3
+DEFAULT_RSSI_MAX_AGE = 60.0
+DEFAULT_SLOT_PENALTY = 10
+
+
+class ConnectionRouter:
+    """Choose the adapter to connect to a device through.
+
+    Adapters that heard the device within rssi_max_age seconds and have a
+    free connection slot are candidates. The one with the best signal wins,
+    with slot_penalty dB subtracted per connection already using an
+    adapter, which spreads connections across adapters of similar signal.
+
+    Use the router as a context manager to hold the hub for as long as it
+    routes, so its sightings keep accumulating in the shared hub.
+    """
+
+    def __init__(
+        self,
+        hub: ScannerHub,
+        *,
+        slots: int = DEFAULT_CONNECTION_SLOTS,
+        rssi_max_age: float = DEFAULT_RSSI_MAX_AGE,
+        slot_penalty: int = DEFAULT_SLOT_PENALTY,
+    ) -> None:
+        self.hub = hub
+        self.slots = slots
+        self.rssi_max_age = rssi_max_age
+        self.slot_penalty = slot_penalty
+        self.connections = Counter[str]()
+
+    def __enter__(self) -> "ConnectionRouter":
+        self.hub.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.hub.release()
+
+    def select(self, address: str, now: float | None = None) -> AdapterSighting | None:
+        """Get the sighting of the device through the best adapter, if any."""
+        if (sightings := self.hub.sightings.get(address)) is None:
+            return None
+        if now is None:
+            now = time.monotonic()
+
+        best = None
+        best_score = None
+        for sighting in sightings.values():
+            used = self.connections[sighting.adapter]
+            if used >= self.slots or now - sighting.time > self.rssi_max_age:
+                continue
+            score = sighting.rssi - self.slot_penalty * used
+            if best_score is None or score > best_score:
+                best, best_score = sighting, score
+        return best
+
+    def acquire(self, adapter: str) -> None:
+        self.connections[adapter] += 1
+
+    def release(self, adapter: str) -> None:
+        self.connections[adapter] -= 1
+        if self.connections[adapter] <= 0:
+            del self.connections[adapter]
+
+
+class RoutedConnection(CachedConnection):
+    """Cached connection established through the adapter chosen by a router.
+
+    Falls back to the device from device_lookup when no adapter has a free
+    slot or recent sighting of the device.
+    """
+
+    def __init__(
+        self,
+        disconnect_delay: float,
+        device_lookup: Callable[[], BLEDevice],
+        router: ConnectionRouter,
+        max_attempts=1,
+        connector: Callable[[BLEDevice], Awaitable[BleakClient]] | None = None,
+    ) -> None:
+        super().__init__(disconnect_delay, device_lookup, max_attempts, connector)
+        self._router = router
+        self._adapter: str | None = None
+
+    def _release(self) -> None:
+        if self._adapter is not None:
+            self._router.release(self._adapter)
+            self._adapter = None
+
+    async def _disconnect(self):
+        await super()._disconnect()
+        self._release()
+
+    def _device(self) -> BLEDevice:
+        device = self._lookup()
+        if (sighting := self._router.select(device.address)) is None:
+            return device
+
+        LOGGER.debug("Routing %s through %s", device.address, sighting.adapter)
+        self._adapter = sighting.adapter
+        self._router.acquire(sighting.adapter)
+        return sighting.device
+
+    async def _connect(self) -> BleakClient:
+        # The previous connection may have dropped without a disconnect
+        self._release()
+        try:
+            return await super()._connect()
+        except BaseException:
+            self._release()
+            raise
@@ -0,0 +1,139 @@
+import dataclasses
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any
+
+from .parse import ManufacturerData, ProductGroup, ProductModelWaterControl
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CACHE_MAX_AGE = 30 * 24 * 3600.0
+CACHE_VERSION = 1
+
+
+@dataclasses.dataclass
+class CacheEntry:
+    manufacturer_data: ManufacturerData
+    updated: float
+    """Wall clock time the entry was last refreshed from an advertisement."""
+
+
+def _encode_manufacturer_data(manufacturer_data: ManufacturerData) -> dict[str, Any]:
+    return {
+        field.name: getattr(manufacturer_data, field.name)
+        for field in dataclasses.fields(manufacturer_data)
+    }
+
+
+def _decode_manufacturer_data(data: dict[str, Any]) -> ManufacturerData:
+    manufacturer_data = ManufacturerData(**data)
+    if manufacturer_data.group is not None:
+        manufacturer_data.group = ProductGroup.enum_or_int(manufacturer_data.group)
+    if (
+        manufacturer_data.group == ProductGroup.WATER_CONTROL
+        and manufacturer_data.model is not None
+    ):
+        manufacturer_data.model = ProductModelWaterControl.enum_or_int(
+            manufacturer_data.model
+        )
+    return manufacturer_data
+
+
+class ManufacturerDataCache:
+    """Last known manufacturer data per address, optionally kept in a file.
+
+    The fields identifying the product type never change for a device, so
+    they can be used from the cache without waiting for advertisements.
+    Entries not refreshed within max_age seconds are treated as missing.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike | None = None,
+        *,
+        max_age: float | None = DEFAULT_CACHE_MAX_AGE,
+    ) -> None:
+        self.path = Path(path) if path is not None else None
+        self.max_age = max_age
+        self._entries: dict[str, CacheEntry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, address: str) -> bool:
+        return address in self._entries
+
+    def entry(self, address: str) -> CacheEntry | None:
+        return self._entries.get(address)
+
+    def age(self, address: str, now: float | None = None) -> float | None:
+        """Seconds since the entry was refreshed, or None if not cached."""
+        if (entry := self._entries.get(address)) is None:
+            return None
+        return (time.time() if now is None else now) - entry.updated
+
+    def get(self, address: str, now: float | None = None) -> ManufacturerData | None:
+        """Get a copy of the cached manufacturer data, if not stale."""
+        if (entry := self._entries.get(address)) is None:
+            return None
+        if self.max_age is not None:
+            if (time.time() if now is None else now) - entry.updated > self.max_age:
+                return None
+        return dataclasses.replace(entry.manufacturer_data)
+
+    def update(
+        self,
+        address: str,
+        manufacturer_data: ManufacturerData,
+        now: float | None = None,
+    ) -> None:
+        self._entries[address] = CacheEntry(
+            dataclasses.replace(manufacturer_data),
+            time.time() if now is None else now,
+        )
+
+    def load(self) -> None:
+        """Load entries from the cache file, ignoring a missing or broken file."""
+        if self.path is None:
+            return
+        try:
+            data = json.loads(self.path.read_text())
+            if data.get("version") != CACHE_VERSION:
+                LOGGER.debug("Ignoring cache %s of other version", self.path)
+                return
+            entries = {
+                address: CacheEntry(
+                    _decode_manufacturer_data(entry["manufacturer_data"]),
+                    entry["updated"],
+                )
+                for address, entry in data["devices"].items()
+            }
+        except FileNotFoundError:
+            return
+        except (ValueError, KeyError, TypeError, AttributeError) as exc:
+            LOGGER.warning("Ignoring invalid cache %s: %s", self.path, exc)
+            return
+        self._entries.update(entries)
+
+    def save(self) -> None:
+        """Write entries to the cache file, replacing it atomically."""
+        if self.path is None:
+            return
+        data = {
+            "version": CACHE_VERSION,
+            "devices": {
+                address: {
+                    "manufacturer_data": _encode_manufacturer_data(
+                        entry.manufacturer_data
+                    ),
+                    "updated": entry.updated,
+                }
+                for address, entry in self._entries.items()
+            },
+        }
+        temp = self.path.with_name(f"{self.path.name}.tmp")
+        temp.write_text(json.dumps(data, indent=2))
+        os.replace(temp, self.path)
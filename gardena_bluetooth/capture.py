@@ -0,0 +1,189 @@
+"""Capture and replay of advertisement streams.
+
+A capture file holds one JSON object per line, gzip compressed when the
+file name ends with ``.gz``. The first line is a header, and each further
+line an advertisement, with its time as seconds since the start of the
+capture. Empty fields are left out to keep the file compact.
+"""
+
+import asyncio
+import contextlib
+import gzip
+import json
+import os
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import IO, Any
+
+from bleak import AdvertisementData, BaseBleakScanner, BLEDevice
+
+CAPTURE_VERSION = 1
+
+
+def _open(path: str | os.PathLike, mode: str) -> IO[str]:
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _encode(
+    offset: float, device: BLEDevice, advertisement: AdvertisementData
+) -> dict[str, Any]:
+    record: dict[str, Any] = {
+        "t": round(offset, 6),
+        "a": device.address,
+        "r": advertisement.rssi,
+    }
+    if device.name is not None:
+        record["n"] = device.name
+    if advertisement.local_name is not None:
+        record["l"] = advertisement.local_name
+    if advertisement.manufacturer_data:
+        record["m"] = [
+            [company, data.hex()]
+            for company, data in advertisement.manufacturer_data.items()
+        ]
+    if advertisement.service_data:
+        record["s"] = {
+            uuid: data.hex() for uuid, data in advertisement.service_data.items()
+        }
+    if advertisement.service_uuids:
+        record["u"] = advertisement.service_uuids
+    if advertisement.tx_power is not None:
+        record["p"] = advertisement.tx_power
+    return record
+
+
+def _decode(record: dict[str, Any]) -> tuple[float, BLEDevice, AdvertisementData]:
+    device = BLEDevice(address=record["a"], name=record.get("n"), details=None)
+    advertisement = AdvertisementData(
+        local_name=record.get("l"),
+        manufacturer_data={
+            company: bytes.fromhex(data) for company, data in record.get("m", ())
+        },
+        service_data={
+            uuid: bytes.fromhex(data) for uuid, data in record.get("s", {}).items()
+        },
+        service_uuids=record.get("u", []),
+        tx_power=record.get("p"),
+        rssi=record["r"],
+        platform_data=(),
+    )
+    return record["t"], device, advertisement
+
+
+class CaptureWriter:
+    """Write advertisements to a capture file.
+
+    Can be used directly as a detection callback of a scanner.
+    """
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        self.path = Path(path)
+        self.count = 0
+        self._file: IO[str] | None = None
+        self._start = 0.0
+
+    def open(self) -> None:
+        self._file = _open(self.path, "w")
+        self._start = time.monotonic()
+        header = {"version": CAPTURE_VERSION, "start": time.time()}
+        self._file.write(json.dumps(header) + "\n")
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "CaptureWriter":
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def write(
+        self,
+        device: BLEDevice,
+        advertisement: AdvertisementData,
+        offset: float | None = None,
+    ) -> None:
+        if self._file is None:
+            raise ValueError("Capture file is not open")
+        if offset is None:
+            offset = time.monotonic() - self._start
+        record = _encode(offset, device, advertisement)
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.count += 1
+
+    def __call__(self, device: BLEDevice, advertisement: AdvertisementData) -> None:
+        self.write(device, advertisement)
+
+
+def read_capture(
+    path: str | os.PathLike,
+) -> Iterator[tuple[float, BLEDevice, AdvertisementData]]:
+    """Read the advertisements of a capture file, with their time offsets."""
+    with _open(path, "r") as file:
+        header = json.loads(next(file))
+        if header.get("version") != CAPTURE_VERSION:
+            raise ValueError(f"Unsupported capture version: {header.get('version')}")
+        for line in file:
+            if line.strip():
+                yield _decode(json.loads(line))
+
+
+def replay_backend(
+    path: str | os.PathLike, *, realtime: bool = True, speed: float = 1.0
+) -> type[BaseBleakScanner]:
+    """Create a scanner backend replaying a capture file.
+
+    The result can be passed as backend to advertisement_queue, the scanner
+    hub or async_scan_devices. With realtime, advertisements are replayed
+    with their captured timing, scaled by speed. Otherwise they are
+    replayed as fast as possible, yielding to the event loop after every
+    advertisement. A consumer that takes each result from its queue before
+    doing other work sees every advertisement at the default queue size,
+    while one that awaits other work in between may fall behind, and then
+    loses advertisements to the overflow policy of its queue. Use an
+    unbounded queue for a lossless replay to such a consumer.
+    """
+
+    class ReplayScanner(BaseBleakScanner):
+        def __init__(self, detection_callback, service_uuids, *args, **kwargs):
+            super().__init__(detection_callback, service_uuids)
+            self._task: asyncio.Task | None = None
+            self.done = asyncio.Event()
+
+        async def start(self) -> None:
+            self.seen_devices = {}
+            self.done.clear()
+            self._task = asyncio.create_task(self._replay())
+
+        async def stop(self) -> None:
+            if (task := self._task) is None:
+                return
+            self._task = None
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+        async def _replay(self) -> None:
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            for offset, device, advertisement in read_capture(path):
+                if realtime:
+                    await asyncio.sleep(start + offset / speed - loop.time())
+                else:
+                    await asyncio.sleep(0)
+
+                if not self.is_allowed_uuid(advertisement.service_uuids):
+                    continue
+                device = self.create_or_update_device(
+                    device.address, device.address, device.name, None, advertisement
+                )
+                self.call_detection_callbacks(device, advertisement)
+            self.done.set()
+
+    return ReplayScanner
@@ -1,9 +1,10 @@
 import asyncio
 import logging
-from collections.abc import Awaitable, Callable
+from collections.abc import Awaitable, Callable, Mapping, Sequence
 from contextlib import asynccontextmanager
-from datetime import datetime
-from typing import TypeVar, overload
+from dataclasses import fields, replace
+from datetime import datetime, time, timedelta
+from typing import Any, TypeVar, overload
 
 from bleak import BleakClient
 from bleak.backends.characteristic import BleakGATTCharacteristic
@@ -11,6 +12,8 @@ from bleak.backends.device import BLEDevice
 from bleak.exc import BleakError
 from bleak_retry_connector import establish_connection
 
+from . import register_uuid_names
+from .const import SCHEDULES, AquaContourSchedule, Schedule, ScheduleData
 from .exceptions import (
     CharacteristicNoAccess,
     CharacteristicNotFound,
@@ -18,6 +21,8 @@ from .exceptions import (
 )
 from .parse import (
     Characteristic,
+    CharacteristicSchedule,
+    CharacteristicScheduleData,
     CharacteristicTime,
     CharacteristicType,
     ProductType,
@@ -66,6 +71,71 @@ class CallLaterJob:
         self._cancel = asyncio.get_event_loop().call_later(delay, _call)
 
 
+class _NotificationHandler:
+    """Decoder and subscribers of notifications from a single GATT handle."""
+
+    __slots__ = ("char", "callbacks")
+
+    def __init__(self, char: Characteristic) -> None:
+        self.char = char
+        self.callbacks: list[Callable[[object], None]] = []
+
+    def __call__(self, data: bytearray) -> None:
+        try:
+            value = self.char.decode(data)
+        except ValueError:
+            LOGGER.warning(
+                "Failed to parse notification data %s into char %s", data, self.char
+            )
+            return
+
+        for callback in self.callbacks:
+            callback(value)
+
+
+class NotificationDispatcher:
+    """Dispatch table for notifications of a connection, keyed by GATT handle."""
+
+    def __init__(self) -> None:
+        self._handlers: dict[int, _NotificationHandler] = {}
+
+    def __call__(self, gatt_char: BleakGATTCharacteristic, data: bytearray) -> None:
+        if handler := self._handlers.get(gatt_char.handle):
+            handler(data)
+
+    def add(
+        self,
+        handle: int,
+        char: Characteristic[CharacteristicType],
+        callback: Callable[[CharacteristicType], None],
+    ) -> bool:
+        """Add a subscriber, returns true if it is the first one for handle."""
+        if (handler := self._handlers.get(handle)) is None:
+            handler = _NotificationHandler(char)
+            self._handlers[handle] = handler
+        elif handler.char.unique_id != char.unique_id:
+            raise ValueError(
+                f"Handle {handle} is already subscribed as {handler.char.unique_id}"
+            )
+        handler.callbacks.append(callback)
+        return len(handler.callbacks) == 1
+
+    def remove(self, handle: int, callback: Callable[[object], None]) -> bool:
+        """Remove a subscriber, returns true if it was the last one for handle."""
+        handler = self._handlers.get(handle)
+        if handler is None or callback not in handler.callbacks:
+            return False
+        handler.callbacks.remove(callback)
+        if handler.callbacks:
+            return False
+        del self._handlers[handle]
+        return True
+
+    def clear(self) -> None:
+        """Forget all subscribers, notifications do not survive a disconnect."""
+        self._handlers.clear()
+
+
 class CachedConnection:
     """Recursive and delay closed client."""
 
@@ -74,8 +144,13 @@ class CachedConnection:
         disconnect_delay: float,
         device_lookup: Callable[[], BLEDevice],
         max_attempts=1,
+        connector: Callable[[BLEDevice], Awaitable[BleakClient]] | None = None,
     ) -> None:
-        """Initialize cached client."""
+        """Initialize cached client.
+
+        A connector replaces establish_connection, for example to connect to
+        simulated devices.
+        """
 
         self._client: BleakClient | None = None
         self._lock = asyncio.Lock()
@@ -84,6 +159,10 @@ class CachedConnection:
         self._disconnect_delay = disconnect_delay
         self._disconnect_job = CallLaterJob(self._disconnect)
         self._max_attempts = max_attempts
+        self._connector = connector
+        self.notifications = NotificationDispatcher()
+        self.connects = 0
+        """Number of connections established."""
 
     async def disconnect(self):
         await self._disconnect_job.call_now()
@@ -93,20 +172,31 @@ class CachedConnection:
             if client := self._client:
                 LOGGER.debug("Disconnecting from %s", self._client.address)
                 self._client = None
+                self.notifications.clear()
                 await client.disconnect()
 
+    def _device(self) -> BLEDevice:
+        """Device to connect to."""
+        return self._lookup()
+
     async def _connect(self) -> BleakClient:
-        device = self._lookup()
+        register_uuid_names()
+        device = self._device()
 
         LOGGER.debug("Connecting to %s", device.address)
-        self._client = await establish_connection(
-            BleakClient,
-            device,
-            "Gardena Bluetooth",
-            use_services_cache=True,
-            max_attempts=self._max_attempts,
-        )
+        self.notifications.clear()
+        if self._connector is not None:
+            self._client = await self._connector(device)
+        else:
+            self._client = await establish_connection(
+                BleakClient,
+                device,
+                "Gardena Bluetooth",
+                use_services_cache=True,
+                max_attempts=self._max_attempts,
+            )
         LOGGER.debug("Connected to %s", device.address)
+        self.connects += 1
         return self._client
 
     @asynccontextmanager
@@ -135,6 +225,13 @@ class CachedConnection:
             ) from exception
 
 
+def _inactive_schedule(current: Any) -> CharacteristicScheduleData:
+    """Current schedule with active cleared, or an empty inactive one."""
+    if current is DEFAULT_MISSING:
+        return CharacteristicScheduleData(time(0), timedelta(0), set(), False, set())
+    return replace(current, active=False)
+
+
 class Client:
     def __init__(
         self,
@@ -146,13 +243,10 @@ class Client:
         else:
             self._client = CachedConnection(DEFAULT_DELAY, lambda: client_or_device)
 
-        self._services = Service.services_for_product_type(product_type)
+        self._catalog = Service.catalog(product_type)
+        self._services = self._catalog.services
         self._product_type = product_type
-        self._unique_id = {
-            char.unique_id
-            for service in self._services
-            for char in service.characteristics.values()
-        }
+        self._unique_id = self._catalog.unique_ids
 
     async def disconnect(self):
         await self._client.disconnect()
@@ -169,16 +263,21 @@ class Client:
         self, uuid: str, default: DEFAULT_TYPE = DEFAULT_MISSING
     ) -> bytes | DEFAULT_TYPE:
         async with self._client() as client:
-            characteristic = client.services.get_characteristic(uuid)
-            if characteristic is None:
-                if default is not DEFAULT_MISSING:
-                    return default
-                raise CharacteristicNotFound(f"Unable to find characteristic {uuid}")
-            if "read" not in characteristic.properties:
-                if default is not DEFAULT_MISSING:
-                    return default
-                raise CharacteristicNoAccess(f"Characteristic {uuid} is not readable")
-            return await client.read_gatt_char(characteristic)
+            return await self._read_char_raw(client, uuid, default)
+
+    async def _read_char_raw(
+        self, client: BleakClient, uuid: str, default: DEFAULT_TYPE = DEFAULT_MISSING
+    ) -> bytes | DEFAULT_TYPE:
+        characteristic = client.services.get_characteristic(uuid)
+        if characteristic is None:
+            if default is not DEFAULT_MISSING:
+                return default
+            raise CharacteristicNotFound(f"Unable to find characteristic {uuid}")
+        if "read" not in characteristic.properties:
+            if default is not DEFAULT_MISSING:
+                return default
+            raise CharacteristicNoAccess(f"Characteristic {uuid} is not readable")
+        return await client.read_gatt_char(characteristic)
 
     @overload
     async def read_char(
@@ -204,37 +303,270 @@ class Client:
                 return default
             raise CharacteristicNotFound
 
+        async with self._client() as client:
+            return await self._read_char(client, char, default)
+
+    async def _read_char(
+        self,
+        client: BleakClient,
+        char: Characteristic[CharacteristicType],
+        default: DEFAULT_TYPE = DEFAULT_MISSING,
+    ) -> CharacteristicType | DEFAULT_TYPE:
         try:
-            return char.decode(await self.read_char_raw(char.uuid))
+            return char.decode(await self._read_char_raw(client, char.uuid))
         except CharacteristicNotFound:
             if default is not DEFAULT_MISSING:
                 return default
             raise
 
+    async def read_chars(
+        self,
+        chars: Sequence[Characteristic],
+        default: DEFAULT_TYPE = DEFAULT_MISSING,
+    ) -> list:
+        """Read multiple characteristics using a single connection.
+
+        The reads are issued concurrently, so the backend can queue them
+        back to back. Values are returned in the order of the given chars.
+        """
+        for char in chars:
+            if char.unique_id not in self._unique_id and default is DEFAULT_MISSING:
+                raise CharacteristicNotFound(f"Unsupported characteristic {char}")
+
+        async def _read(client: BleakClient, char: Characteristic):
+            if char.unique_id not in self._unique_id:
+                return default
+            return await self._read_char(client, char, default)
+
+        async with self._client() as client:
+            return await asyncio.gather(*(_read(client, char) for char in chars))
+
+    async def update_chars(
+        self,
+        values: Sequence[tuple[Characteristic, Any]],
+        response: bool | None = None,
+    ) -> list[Characteristic]:
+        """Write the values that differ from the values on the device.
+
+        Current values are read and changed ones written using a single
+        connection. Returns the characteristics that were written.
+        """
+        for char, _ in values:
+            if char.unique_id not in self._unique_id:
+                raise CharacteristicNotFound(f"Unsupported characteristic {char}")
+
+        async with self._client() as client:
+            current = await asyncio.gather(
+                *(self._read_current(client, char) for char, _ in values)
+            )
+            changed = await self._write_changed(client, values, current, response)
+
+        LOGGER.debug("Updated %d of %d characteristics", len(changed), len(values))
+        return changed
+
+    async def _write_changed(
+        self,
+        client: BleakClient,
+        values: Sequence[tuple[Characteristic, Any]],
+        current: Sequence[Any],
+        response: bool | None,
+    ) -> list[Characteristic]:
+        """Write the values differing from the current ones, or not read."""
+        changed = [
+            (char, value)
+            for (char, value), old in zip(values, current)
+            if old is DEFAULT_MISSING or old != value
+        ]
+        for char, value in changed:
+            await self._write_char_raw(client, char.uuid, char.encode(value), response)
+        return [char for char, _ in changed]
+
+    async def _read_current(self, client: BleakClient, char: Characteristic) -> Any:
+        """Read current value, or DEFAULT_MISSING if it can't be read or decoded."""
+        try:
+            return await self._read_char(client, char)
+        except (CharacteristicNoAccess, ValueError):
+            return DEFAULT_MISSING
+
+    async def reconcile(
+        self,
+        service: type[Service],
+        desired: Mapping[str, Any],
+        response: bool | None = None,
+    ) -> list[str]:
+        """Bring the characteristics of a service to a desired state.
+
+        The desired state maps attribute names of the service, like
+        ``rain_pause`` on ``DeviceConfiguration``, to values. Only the
+        desired characteristics are read, in one batch, and only the
+        differing values are written. Returns the attribute names of the
+        written characteristics.
+        """
+        chars = {
+            name: value
+            for name, value in vars(service).items()
+            if isinstance(value, Characteristic)
+        }
+        if unknown := desired.keys() - chars.keys():
+            raise ValueError(
+                f"Unknown characteristics for {service.__name__}: {unknown}"
+            )
+
+        chars = {
+            name: chars[name]
+            for name in desired
+            if chars[name].unique_id in self._unique_id
+        }
+        if unsupported := desired.keys() - chars.keys():
+            raise CharacteristicNotFound(
+                f"Unsupported characteristics for {service.__name__}: {unsupported}"
+            )
+
+        async with self._client() as client:
+            current = await asyncio.gather(
+                *(self._read_current(client, char) for char in chars.values())
+            )
+            values = {
+                name: value
+                for name, value in zip(chars, current)
+                if value is not DEFAULT_MISSING
+            }
+
+            changed = [
+                name
+                for name, value in desired.items()
+                if name not in values or values[name] != value
+            ]
+            for name in changed:
+                char = chars[name]
+                await self._write_char_raw(
+                    client, char.uuid, char.encode(desired[name]), response
+                )
+
+        LOGGER.debug("Reconciled %s, changed %s", service.__name__, changed)
+        return changed
+
+    async def sync_schedules(
+        self,
+        schedules: Sequence[CharacteristicScheduleData | None],
+        chars: Sequence[CharacteristicSchedule] = AquaContourSchedule.schedules,
+    ) -> list[CharacteristicSchedule]:
+        """Synchronize schedule slots, only writing slots that changed.
+
+        Slots are assigned in order, a None entry leaves a slot as is. Slots
+        beyond the given schedules are deactivated, keeping their other
+        settings, so a schedule removed from the plan stops running. Pass
+        None for them to leave them as is. Returns the slots that were
+        written.
+        """
+        if len(schedules) > len(chars):
+            raise ValueError(
+                f"Got {len(schedules)} schedules for only {len(chars)} slots"
+            )
+
+        given = [
+            (char, schedule)
+            for char, schedule in zip(chars, schedules)
+            if schedule is not None
+        ]
+        trailing = chars[len(schedules) :]
+        slots = [char for char, _ in given] + list(trailing)
+        for char in slots:
+            if char.unique_id not in self._unique_id:
+                raise CharacteristicNotFound(f"Unsupported characteristic {char}")
+
+        async with self._client() as client:
+            current = await asyncio.gather(
+                *(self._read_current(client, char) for char in slots)
+            )
+            values = given + [
+                (char, _inactive_schedule(schedule))
+                for char, schedule in zip(trailing, current[len(given) :])
+            ]
+            changed = await self._write_changed(client, values, current, None)
+
+        LOGGER.debug(
+            "Synchronized %d schedule slots, wrote %d", len(slots), len(changed)
+        )
+        return changed
+
+    async def read_schedules(
+        self, services: Sequence[type[Schedule]] = SCHEDULES
+    ) -> list[ScheduleData | None]:
+        """Read legacy schedules, all fields of all schedules in one batch.
+
+        Schedules not supported by the device are returned as None.
+        """
+        names = [field.name for field in fields(ScheduleData)]
+        values = await self.read_chars(
+            [getattr(service, name) for service in services for name in names],
+            None,
+        )
+
+        schedules: list[ScheduleData | None] = []
+        for index in range(0, len(values), len(names)):
+            data = values[index : index + len(names)]
+            if any(value is None for value in data):
+                schedules.append(None)
+            else:
+                schedules.append(ScheduleData(*data))
+        return schedules
+
+    async def write_schedules(
+        self,
+        schedules: Sequence[ScheduleData | None],
+        services: Sequence[type[Schedule]] = SCHEDULES,
+    ) -> list[Characteristic]:
+        """Write legacy schedules, only touching fields that differ.
+
+        Schedules are assigned to services in order, a None entry leaves a
+        schedule as is. Returns the characteristics that were written.
+        """
+        if len(schedules) > len(services):
+            raise ValueError(
+                f"Got {len(schedules)} schedules for only {len(services)} services"
+            )
+
+        return await self.update_chars(
+            [
+                (getattr(service, field.name), getattr(schedule, field.name))
+                for service, schedule in zip(services, schedules)
+                if schedule is not None
+                for field in fields(ScheduleData)
+            ]
+        )
+
     async def write_char_raw(
         self, uuid: str, data: bytes, response: bool | None = None
     ):
+        """Write data to a characteristic."""
         async with self._client() as client:
-            """Write data to a characteristic."""
-            characteristic = client.services.get_characteristic(uuid)
-            if characteristic is None:
-                raise CharacteristicNotFound(f"Unable to find characteristic {uuid}")
+            await self._write_char_raw(client, uuid, data, response)
+
+    async def _write_char_raw(
+        self,
+        client: BleakClient,
+        uuid: str,
+        data: bytes,
+        response: bool | None = None,
+    ):
+        characteristic = client.services.get_characteristic(uuid)
+        if characteristic is None:
+            raise CharacteristicNotFound(f"Unable to find characteristic {uuid}")
 
-            if response is None:
-                response = "write" in characteristic.properties
+        if response is None:
+            response = "write" in characteristic.properties
 
-            if response:
-                if "write" not in characteristic.properties:
-                    raise CharacteristicNoAccess(
-                        f"Characteristic {uuid} is not writable"
-                    )
-            else:
-                if "write-without-response" not in characteristic.properties:
-                    raise CharacteristicNoAccess(
-                        f"Characteristic {uuid} is not writable without response"
-                    )
+        if response:
+            if "write" not in characteristic.properties:
+                raise CharacteristicNoAccess(f"Characteristic {uuid} is not writable")
+        else:
+            if "write-without-response" not in characteristic.properties:
+                raise CharacteristicNoAccess(
+                    f"Characteristic {uuid} is not writable without response"
+                )
 
-            await client.write_gatt_char(characteristic, data, response=response)
+        await client.write_gatt_char(characteristic, data, response=response)
 
     async def write_char(
         self,
@@ -258,7 +590,7 @@ class Client:
             if characteristic is None:
                 raise CharacteristicNotFound(f"Unable to find characteristic {uuid}")
 
-            client.start_notify(characteristic, callback)
+            await client.start_notify(characteristic, callback)
 
             async def _cleanup():
                 await client.stop_notify(characteristic)
@@ -269,28 +601,33 @@ class Client:
         self,
         char: Characteristic[CharacteristicType],
         callback: Callable[[CharacteristicType], None],
-    ):
-        def _callback(char_raw: BleakGATTCharacteristic, data: bytes):
-            if char_raw.uuid != char.uuid:
-                LOGGER.warning(
-                    "Unexpected uuid in callback for %s. Expected %s, actual %s",
-                    char.uuid,
-                    char_raw.uuid,
-                )
-                return
+    ) -> Callable[[], Awaitable[None]]:
+        """Subscribe to decoded notifications from a characteristic."""
+        if char.unique_id not in self._unique_id:
+            raise CharacteristicNotFound
 
-            try:
-                value = char.decode(data)
-            except ValueError:
-                LOGGER.warning(
-                    "Failed to parse notification data %s into char %s", data, char
+        dispatcher = self._client.notifications
+        async with self._client() as client:
+            characteristic = client.services.get_characteristic(char.uuid)
+            if characteristic is None:
+                raise CharacteristicNotFound(
+                    f"Unable to find characteristic {char.uuid}"
                 )
-                return
 
-            LOGGER.debug("Got notification for %s with value %s", char.name, value)
-            callback(value)
+            handle = characteristic.handle
+            if dispatcher.add(handle, char, callback):
+                try:
+                    await client.start_notify(characteristic, dispatcher)
+                except BaseException:
+                    dispatcher.remove(handle, callback)
+                    raise
+
+        async def _cleanup():
+            if dispatcher.remove(handle, callback):
+                async with self._client() as client:
+                    await client.stop_notify(characteristic)
 
-        return self.subscribe_char_raw(char.uuid, _callback)
+        return _cleanup
 
     async def update_timestamp(self, char: CharacteristicTime, now: datetime):
         try:
@@ -317,9 +654,9 @@ class Client:
         uuids = await self.get_all_characteristics_uuid()
         characteristics = {
             char.unique_id: char
-            for service in self._services
-            for char in service.characteristics.values()
-            if char.uuid in uuids
+            for uuid, chars in self._catalog.characteristics_by_uuid.items()
+            if uuid in uuids
+            for char in chars
         }
         return characteristics
 
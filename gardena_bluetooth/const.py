@@ -1,4 +1,7 @@
 from abc import ABC
+from calendar import Day
+from dataclasses import dataclass
+from datetime import time, timedelta
 from enum import IntEnum
 from typing import ClassVar
 
@@ -223,6 +226,36 @@ class AquaContourSchedule(Service):
         "98bd0c1f-0b0e-421a-84e5-ddbf75dc6de4", variant="1"
     )
 
+    schedules: ClassVar[tuple[CharacteristicSchedule, ...]] = (
+        schedule_1,
+        schedule_2,
+        schedule_3,
+        schedule_4,
+        schedule_5,
+        schedule_6,
+        schedule_7,
+        schedule_8,
+        schedule_9,
+        schedule_10,
+        schedule_11,
+        schedule_12,
+        schedule_13,
+        schedule_14,
+        schedule_15,
+    )
+
+
+@dataclass
+class ScheduleData:
+    """Combined values of the characteristics of a legacy schedule service."""
+
+    start_time: time
+    duration: timedelta
+    weekdays: set[Day]
+    valve_link: bytes
+    active: bool
+    sensor_link: bool
+
 
 class Schedule(Service, ABC):
     products = set(ProductType) - {ProductType.AQUA_CONTOURS}
@@ -267,6 +300,15 @@ class Schedule_5(Schedule, instance=5):
     pass
 
 
+SCHEDULES: tuple[type[Schedule], ...] = (
+    Schedule_1,
+    Schedule_2,
+    Schedule_3,
+    Schedule_4,
+    Schedule_5,
+)
+
+
 class DeviceInformation(Service):
     uuid = "0000180a-0000-1000-8000-00805f9b34fb"
     model_number = CharacteristicString("00002a24-0000-1000-8000-00805f9b34fb")
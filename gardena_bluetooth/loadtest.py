@@ -0,0 +1,523 @@
+"""Load testing of the client code paths against simulated or real devices."""
+
+import asyncio
+import logging
+import math
+import random
+import struct
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable, Sequence
+from dataclasses import dataclass, field
+
+from bleak import BLEDevice
+
+from .client import CachedConnection, Client
+from .const import AquaContour, AquaContourWatering, Battery, Pump, Valve
+from .exceptions import CommunicationFailure, GardenaBluetoothException
+from .parse import Characteristic, ProductType, Service
+from .simulator import SimulatedClient, SimulatedDevice, sample_for
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_FLEET_MIX = (
+    ProductType.VALVE,
+    ProductType.WATER_COMPUTER,
+    ProductType.PUMP,
+    ProductType.AQUA_CONTOURS,
+)
+
+
+class LatencyStats:
+    """Collected latency samples, in seconds."""
+
+    def __init__(self) -> None:
+        self.samples: list[float] = []
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def add(self, value: float) -> None:
+        self.samples.append(value)
+
+    def percentile(self, percent: float) -> float:
+        """Nearest rank percentile, or nan without samples."""
+        if not self.samples:
+            return math.nan
+        ordered = sorted(self.samples)
+        rank = math.ceil(percent / 100 * len(ordered))
+        return ordered[max(rank, 1) - 1]
+
+    @property
+    def mean(self) -> float:
+        if not self.samples:
+            return math.nan
+        return sum(self.samples) / len(self.samples)
+
+    def summary(self) -> dict[str, float | int]:
+        return {
+            "count": len(self.samples),
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "max": max(self.samples, default=math.nan),
+        }
+
+    def format(self, name: str) -> str:
+        summary = self.summary()
+        return (
+            f"{name:<9} n={summary['count']:<6} "
+            f"p50={summary['p50'] * 1000:8.2f} ms "
+            f"p99={summary['p99'] * 1000:8.2f} ms "
+            f"max={summary['max'] * 1000:8.2f} ms"
+        )
+
+
+class LoopLagMonitor:
+    """Measure how late the event loop runs a periodic timer."""
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self.lag = LatencyStats()
+        self._task: asyncio.Task | None = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lag.add(max(0.0, loop.time() - expected))
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if (task := self._task) is None:
+            return
+        self._task = None
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+class SimulatedGateway:
+    """Connector for simulated devices through a radio with limited slots.
+
+    Connecting waits for a free slot once max_connections clients are
+    connected, and connections are counted per device, so reconnects can
+    be reported.
+    """
+
+    def __init__(self, max_connections: int | None = None) -> None:
+        self.max_connections = max_connections
+        self.connects: dict[str, int] = {}
+        self._slots = (
+            asyncio.Semaphore(max_connections) if max_connections is not None else None
+        )
+
+    @property
+    def reconnects(self) -> int:
+        return sum(max(0, count - 1) for count in self.connects.values())
+
+    def _release(self) -> None:
+        if self._slots is not None:
+            self._slots.release()
+
+    async def __call__(self, device: BLEDevice) -> SimulatedClient:
+        simulated: SimulatedDevice = device.details
+        if self._slots is not None:
+            await self._slots.acquire()
+        try:
+            client = await simulated.connect()
+        except BaseException:
+            self._release()
+            raise
+        client.on_disconnect = self._release
+        self.connects[device.address] = self.connects.get(device.address, 0) + 1
+        return client
+
+
+@dataclass
+class Workload:
+    """Operations each virtual device runs, picked at random by weight."""
+
+    duration: float = 10.0
+    interval: float = 1.0
+    """Mean time between operations of a device."""
+    poll_weight: float = 0.7
+    actuate_weight: float = 0.2
+    notify_weight: float = 0.1
+    disconnect_delay: float = 5.0
+    notify_timeout: float = 2.0
+    """Time to wait for a notification before counting it as lost."""
+    max_connections: int | None = None
+    """Connection slots of the simulated gateway, or unlimited."""
+    seed: int = 0
+
+
+@dataclass
+class FleetReport:
+    devices: int
+    duration: float
+    operations: int = 0
+    errors: int = 0
+    reconnects: int = 0
+    lost_notifications: int = 0
+    faults: Counter[str] = field(default_factory=Counter)
+    """Faults injected by the devices, by kind."""
+    latency: dict[str, LatencyStats] = field(
+        default_factory=lambda: {
+            "poll": LatencyStats(),
+            "actuate": LatencyStats(),
+            "notify": LatencyStats(),
+        }
+    )
+    recovery: LatencyStats = field(default_factory=LatencyStats)
+    """Time from the first failed operation of a device to its next success."""
+    loop_lag: LatencyStats = field(default_factory=LatencyStats)
+
+    @property
+    def throughput(self) -> float:
+        """Completed operations per second."""
+        return self.operations / self.duration if self.duration else math.nan
+
+    def format(self) -> str:
+        lines = [
+            f"Devices: {self.devices}, duration: {self.duration:.1f} s",
+            f"Operations: {self.operations} ({self.throughput:.1f}/s), "
+            f"errors: {self.errors}, reconnects: {self.reconnects}, "
+            f"lost notifications: {self.lost_notifications}",
+        ]
+        if self.faults:
+            injected = ", ".join(
+                f"{kind}: {count}" for kind, count in self.faults.items()
+            )
+            lines.append(f"Injected faults: {injected}")
+        for name, stats in {
+            **self.latency,
+            "recovery": self.recovery,
+            "loop lag": self.loop_lag,
+        }.items():
+            lines.append(stats.format(name))
+        return "\n".join(lines)
+
+
+WORKLOAD_PROFILES: dict[
+    ProductType, tuple[tuple[Characteristic, ...], Characteristic]
+] = {
+    ProductType.VALVE: (
+        (Valve.state, Valve.remaining_open_time, Valve.connected_state),
+        Valve.remaining_open_time,
+    ),
+    ProductType.WATER_COMPUTER: (
+        (
+            Valve.state,
+            Valve.remaining_open_time,
+            Valve.connected_state,
+            Battery.battery_level,
+        ),
+        Valve.remaining_open_time,
+    ),
+    ProductType.PUMP: (
+        (Pump.status, Pump.tank_preassure, Pump.flow_rate, Pump.water_temperature),
+        Pump.direct_start,
+    ),
+    ProductType.AQUA_CONTOURS: (
+        (
+            AquaContour.frost_warning,
+            AquaContourWatering.remaining_watering_time,
+            AquaContourWatering.manual_watering_time,
+            Battery.battery_level,
+        ),
+        AquaContourWatering.manual_watering_time,
+    ),
+}
+"""Characteristics polled, and the one actuated, per product type."""
+
+WRITE_BACK_CHARS: dict[ProductType, Characteristic] = {
+    ProductType.VALVE: Valve.manual_watering_time,
+    ProductType.WATER_COMPUTER: Valve.manual_watering_time,
+    ProductType.PUMP: Pump.child_lock,
+}
+"""Setting written back by the benchmark, per product type.
+
+Countdowns and starts, like the remaining open time of a valve, act again
+when written back, so only plain settings are written.
+"""
+
+
+def workload_chars(
+    product_type: ProductType,
+) -> tuple[tuple[Characteristic, ...], Characteristic | None]:
+    """Characteristics polled, and the one actuated, for a product type."""
+    if (profile := WORKLOAD_PROFILES.get(product_type)) is not None:
+        return profile
+
+    chars = tuple(
+        char
+        for service in Service.services_for_product_type(product_type)
+        for char in service.characteristics.values()
+        if sample_for(char) is not None
+    )
+    return chars[:4], None
+
+
+def simulated_fleet(
+    count: int,
+    product_types: Sequence[ProductType] = DEFAULT_FLEET_MIX,
+    **kwargs,
+) -> list[SimulatedDevice]:
+    """Create count simulated devices, cycling through the product types."""
+    return [
+        SimulatedDevice(
+            f"00:00:00:{index >> 16 & 0xFF:02X}:{index >> 8 & 0xFF:02X}:{index & 0xFF:02X}",
+            product_types[index % len(product_types)],
+            serial=index,
+            **kwargs,
+        )
+        for index in range(count)
+    ]
+
+
+class _DeviceWorker:
+    def __init__(
+        self,
+        device: SimulatedDevice,
+        gateway: SimulatedGateway,
+        workload: Workload,
+        report: FleetReport,
+        rng: random.Random,
+    ) -> None:
+        self.device = device
+        self.workload = workload
+        self.report = report
+        self.rng = rng
+        self.connection = CachedConnection(
+            workload.disconnect_delay, lambda: device.ble_device, connector=gateway
+        )
+        self.client = Client(self.connection, device.product_type)
+        self.poll, self.actuate = workload_chars(device.product_type)
+        self.failed_at: float | None = None
+
+    async def _poll(self) -> None:
+        await self.client.read_chars(self.poll)
+
+    async def _actuate(self) -> None:
+        if (char := self.actuate) is None:
+            return
+        await self.client.write_char(char, char.decode(sample_for(char)))
+
+    async def _notify(self) -> None:
+        if (char := self.actuate) is None:
+            return
+        received = asyncio.Event()
+        cleanup = await self.client.subscribe_char(char, lambda _: received.set())
+        try:
+            self.device.set_value(char.uuid, sample_for(char))
+            try:
+                async with asyncio.timeout(self.workload.notify_timeout):
+                    await received.wait()
+            except TimeoutError:
+                self.report.lost_notifications += 1
+                raise CommunicationFailure("Notification was lost") from None
+        finally:
+            await cleanup()
+
+    async def run(self, deadline: float) -> None:
+        operations = {
+            "poll": self._poll,
+            "actuate": self._actuate,
+            "notify": self._notify,
+        }
+        names = list(operations)
+        weights = [
+            self.workload.poll_weight,
+            self.workload.actuate_weight,
+            self.workload.notify_weight,
+        ]
+        loop = asyncio.get_running_loop()
+
+        # Spread the start of the devices over one interval
+        await asyncio.sleep(self.rng.uniform(0, self.workload.interval))
+        while loop.time() < deadline:
+            (name,) = self.rng.choices(names, weights)
+            start = time.perf_counter()
+            try:
+                async with asyncio.timeout(max(0.0, deadline - loop.time())):
+                    await operations[name]()
+            except TimeoutError:
+                break
+            except Exception as exc:
+                LOGGER.debug("%s failed on %s: %r", name, self.device.address, exc)
+                self.report.errors += 1
+                if self.failed_at is None:
+                    self.failed_at = start
+            else:
+                end = time.perf_counter()
+                self.report.latency[name].add(end - start)
+                self.report.operations += 1
+                if self.failed_at is not None:
+                    self.report.recovery.add(end - self.failed_at)
+                    self.failed_at = None
+            await asyncio.sleep(self.rng.expovariate(1 / self.workload.interval))
+
+        await self.connection.disconnect()
+
+
+async def run_fleet(
+    devices: Sequence[SimulatedDevice], workload: Workload | None = None
+) -> FleetReport:
+    """Drive a workload through Client against simulated devices."""
+    workload = workload or Workload()
+    rng = random.Random(workload.seed)
+    gateway = SimulatedGateway(workload.max_connections)
+    report = FleetReport(len(devices), workload.duration)
+    workers = [
+        _DeviceWorker(device, gateway, workload, report, random.Random(rng.random()))
+        for device in devices
+    ]
+
+    monitor = LoopLagMonitor()
+    monitor.start()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + workload.duration
+    try:
+        await asyncio.gather(*(worker.run(deadline) for worker in workers))
+    finally:
+        await monitor.stop()
+
+    report.reconnects = gateway.reconnects
+    for device in devices:
+        report.faults.update(device.injected)
+    report.loop_lag = monitor.lag
+    return report
+
+
+BENCH_OPERATIONS = ("connect", "read", "subscribe", "notify", "write")
+
+
+@dataclass
+class BenchReport:
+    cycles: int
+    connects: int = 0
+    expected_connects: int = 0
+    errors: int = 0
+    latency: dict[str, LatencyStats] = field(
+        default_factory=lambda: {name: LatencyStats() for name in BENCH_OPERATIONS}
+    )
+
+    @property
+    def reconnects(self) -> int:
+        """Connections established beyond those the benchmark asked for."""
+        return max(0, self.connects - self.expected_connects)
+
+    @property
+    def reconnect_rate(self) -> float:
+        """Unexpected reconnects per cycle."""
+        return self.reconnects / self.cycles if self.cycles else math.nan
+
+    def format(self) -> str:
+        lines = [
+            f"Cycles: {self.cycles}, errors: {self.errors}, "
+            f"connects: {self.connects}, reconnects: {self.reconnects} "
+            f"({self.reconnect_rate:.2f}/cycle)",
+        ]
+        for name, stats in self.latency.items():
+            if stats:
+                lines.append(stats.format(name))
+        return "\n".join(lines)
+
+
+async def run_bench(
+    connection: CachedConnection,
+    client: Client,
+    product_type: ProductType,
+    *,
+    cycles: int = 20,
+    reconnect: bool = True,
+    write: bool = False,
+    notify_timeout: float = 2.0,
+    trigger: Callable[[Characteristic], None] | None = None,
+) -> BenchReport:
+    """Run connect, read, subscribe and write cycles through a client.
+
+    With reconnect, every cycle starts from a new connection, otherwise the
+    connection is kept and only dropped links cause reconnects. Writes put
+    back the value just read of a setting from WRITE_BACK_CHARS, so they do
+    not change the state of a real device. Notifications are only measured with a trigger, which changes
+    the value of a characteristic on the device side.
+    """
+    poll, actuate = workload_chars(product_type)
+    writable = WRITE_BACK_CHARS.get(product_type) if write else None
+    report = BenchReport(cycles)
+
+    def _record(name: str, start: float) -> None:
+        report.latency[name].add(time.perf_counter() - start)
+
+    async def _attempt(name: str, operation: Awaitable[None]) -> bool:
+        try:
+            await operation
+        except (
+            GardenaBluetoothException,
+            TimeoutError,
+            ValueError,
+            IndexError,
+            struct.error,
+        ) as exc:
+            LOGGER.debug("%s failed: %r", name, exc)
+            report.errors += 1
+            return False
+        return True
+
+    async def _connect() -> None:
+        start = time.perf_counter()
+        async with connection():
+            pass
+        _record("connect", start)
+
+    async def _read(char: Characteristic) -> None:
+        start = time.perf_counter()
+        await client.read_char(char)
+        _record("read", start)
+
+    async def _notify(char: Characteristic) -> None:
+        received = asyncio.Event()
+        start = time.perf_counter()
+        cleanup = await client.subscribe_char(char, lambda _: received.set())
+        _record("subscribe", start)
+        try:
+            if trigger is not None:
+                start = time.perf_counter()
+                trigger(char)
+                async with asyncio.timeout(notify_timeout):
+                    await received.wait()
+                _record("notify", start)
+        finally:
+            await cleanup()
+
+    async def _write(char: Characteristic) -> None:
+        value = await client.read_char(char)
+        start = time.perf_counter()
+        await client.write_char(char, value)
+        _record("write", start)
+
+    connects = connection.connects
+    for cycle in range(cycles):
+        if reconnect or cycle == 0:
+            report.expected_connects += 1
+            if not await _attempt("connect", _connect()):
+                continue
+        for char in poll:
+            await _attempt("read", _read(char))
+        if actuate is not None:
+            await _attempt("notify", _notify(actuate))
+        if writable is not None:
+            await _attempt("write", _write(writable))
+        if reconnect:
+            await connection.disconnect()
+
+    await connection.disconnect()
+    report.connects = connection.connects - connects
+    return report
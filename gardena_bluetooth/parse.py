@@ -1,12 +1,21 @@
 from abc import ABC
 from calendar import Day
-from dataclasses import dataclass, field
+from collections.abc import Mapping
+from dataclasses import dataclass, field, replace
 from datetime import datetime, time, timedelta, timezone
 from enum import Enum, IntEnum, IntFlag, auto
+from functools import lru_cache
+from struct import Struct
+from struct import error as StructError
+from types import MappingProxyType
 from typing import ClassVar, Generic, Self, TypeVar
 
 CharacteristicType = TypeVar("CharacteristicType")
 
+MANUFACTURER_DATA_CACHE_SIZE = 256
+
+WritableBuffer = bytearray | memoryview
+
 
 def pretty_name(name: str):
     data = name.split("_")
@@ -142,6 +151,19 @@ class WateringSource(EnumOrInt):
     CLOUD = 18
 
 
+_SMP_HEADER = Struct(">BBHBBB")
+
+
+def _pack_into(
+    packer: Struct, buffer: WritableBuffer, offset: int, *values: int
+) -> None:
+    """Pack values, raising OverflowError like int.to_bytes when out of range."""
+    try:
+        packer.pack_into(buffer, offset, *values)
+    except StructError as exc:
+        raise OverflowError(str(exc)) from exc
+
+
 @dataclass
 class CharacteristicSMPData:
     res: int
@@ -185,18 +207,39 @@ class CharacteristicSMPData:
         )
 
     @classmethod
-    def encode(cls, value: "CharacteristicSMPData") -> bytes:
+    def encoded_size(cls, value: "CharacteristicSMPData") -> int:
+        return _SMP_HEADER.size + value.data_length
+
+    @classmethod
+    def encode_into(
+        cls, buffer: WritableBuffer, offset: int, value: "CharacteristicSMPData"
+    ) -> int:
         header = (
             ((value.res & 0x03) << 6)
             | ((value.ver & 0x03) << 4)
             | (int(value.op) & 0x0F)
         )
-        return (
-            bytes([header, value.flags])
-            + value.data_length.to_bytes(2, "big")
-            + bytes([int(value.group), value.sequence_num, value.command_id])
-            + value.payload
+        _pack_into(
+            _SMP_HEADER,
+            buffer,
+            offset,
+            header,
+            value.flags,
+            value.data_length,
+            int(value.group),
+            value.sequence_num,
+            value.command_id,
         )
+        offset += _SMP_HEADER.size
+        end = offset + value.data_length
+        buffer[offset:end] = value.payload
+        return end
+
+    @classmethod
+    def encode(cls, value: "CharacteristicSMPData") -> bytes:
+        buffer = bytearray(cls.encoded_size(value))
+        cls.encode_into(buffer, 0, value)
+        return bytes(buffer)
 
 
 @dataclass
@@ -226,6 +269,19 @@ class Characteristic(Generic[CharacteristicType]):
     def encode(cls, data: CharacteristicType) -> bytes:
         raise NotImplementedError(f"Encoding of {type(cls)} is not implemented")
 
+    def encoded_size(self, value: CharacteristicType) -> int:
+        """Number of bytes needed to encode value."""
+        return len(self.encode(value))
+
+    def encode_into(
+        self, buffer: WritableBuffer, offset: int, value: CharacteristicType
+    ) -> int:
+        """Encode value into buffer at offset, returning the offset after it."""
+        data = self.encode(value)
+        end = offset + len(data)
+        buffer[offset:end] = data
+        return end
+
 
 @dataclass
 class CharacteristicPnpIdData:
@@ -276,6 +332,16 @@ class CharacteristicSMP(Characteristic[CharacteristicSMPData]):
     def decode(cls, data: bytes) -> CharacteristicSMPData:
         return CharacteristicSMPData.decode(data)
 
+    @classmethod
+    def encoded_size(cls, value: CharacteristicSMPData) -> int:
+        return CharacteristicSMPData.encoded_size(value)
+
+    @classmethod
+    def encode_into(
+        cls, buffer: WritableBuffer, offset: int, value: CharacteristicSMPData
+    ) -> int:
+        return CharacteristicSMPData.encode_into(buffer, offset, value)
+
     @classmethod
     def encode(cls, value: CharacteristicSMPData) -> bytes:
         return CharacteristicSMPData.encode(value)
@@ -460,6 +526,13 @@ class CharacteristicUInt16PairArray(Characteristic[list[tuple[int, int]]]):
         )
 
 
+def _bitmask(values: set[Day] | set["Contour"]) -> int:
+    int_value = 0
+    for value in values:
+        int_value |= 1 << value.value
+    return int_value
+
+
 @dataclass
 class CharacteristicWeekdays(Characteristic[set[Day]]):
     @classmethod
@@ -469,10 +542,7 @@ class CharacteristicWeekdays(Characteristic[set[Day]]):
 
     @classmethod
     def encode(cls, value: set[Day]) -> bytes:
-        int_value = 0
-        for day in value:
-            int_value |= 1 << day.value
-        return int_value.to_bytes(1, "little", signed=False)
+        return _bitmask(value).to_bytes(1, "little", signed=False)
 
 
 class Contour(IntEnum):
@@ -495,10 +565,7 @@ class CharacteristicContours(Characteristic[set[Contour]]):
 
     @classmethod
     def encode(cls, value: set[Contour]) -> bytes:
-        int_value = 0
-        for x in value:
-            int_value |= 1 << x.value
-        return int_value.to_bytes(1, "little", signed=False)
+        return _bitmask(value).to_bytes(1, "little", signed=False)
 
 
 @dataclass
@@ -518,6 +585,10 @@ class CharacteristicTime(Characteristic[datetime]):
         )
 
 
+def _seconds_of_day(value: time) -> int:
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
 @dataclass
 class CharacteristicTimeOfDay(Characteristic[time]):
     @classmethod
@@ -529,11 +600,7 @@ class CharacteristicTimeOfDay(Characteristic[time]):
 
     @classmethod
     def encode(cls, value: time) -> bytes:
-        return (
-            timedelta(hours=value.hour, minutes=value.minute, seconds=value.second)
-            .total_seconds()
-            .to_bytes(4, "little", signed=True)
-        )
+        return _seconds_of_day(value).to_bytes(4, "little", signed=True)
 
 
 @dataclass
@@ -545,7 +612,7 @@ class CharacteristicTimeDelta(Characteristic[timedelta]):
 
     @classmethod
     def encode(cls, value: timedelta) -> bytes:
-        return value.total_seconds().to_bytes(4, "little", signed=True)
+        return int(value.total_seconds()).to_bytes(4, "little", signed=True)
 
 
 @dataclass
@@ -669,6 +736,10 @@ class CharacteristicBatteryLevelStatusData:
     battery_fault: bool | None = None
 
 
+_UINT16 = Struct("<H")
+_BATTERY_LEVEL_STATUS = Struct("<BH")
+
+
 @dataclass
 class CharacteristicBatteryLevelStatus(
     Characteristic[CharacteristicBatteryLevelStatusData]
@@ -728,7 +799,23 @@ class CharacteristicBatteryLevelStatus(
         )
 
     @classmethod
-    def encode(cls, value: CharacteristicBatteryLevelStatusData) -> bytes:
+    def encoded_size(cls, value: CharacteristicBatteryLevelStatusData) -> int:
+        size = 3
+        if value.identifier is not None:
+            size += 2
+        if value.battery_level is not None:
+            size += 1
+        if value.service_required is not None or value.battery_fault is not None:
+            size += 1
+        return size
+
+    @classmethod
+    def encode_into(
+        cls,
+        buffer: WritableBuffer,
+        offset: int,
+        value: CharacteristicBatteryLevelStatusData,
+    ) -> int:
         power_state = (
             (int(value.battery_present) & 0x01)
             | ((int(value.wired_external_power_source_connected) & 0x03) << 1)
@@ -739,22 +826,32 @@ class CharacteristicBatteryLevelStatus(
             | ((int(value.battery_charging_fault_reason) & 0x07) << 12)
         )
 
+        start = offset
+        offset += 3
         flags = 0
-        tail = b""
         if value.identifier is not None:
             flags |= 0x01
-            tail += value.identifier.to_bytes(2, "little", signed=False)
+            _pack_into(_UINT16, buffer, offset, value.identifier)
+            offset += 2
         if value.battery_level is not None:
             flags |= 0x02
-            tail += bytes([value.battery_level])
+            buffer[offset] = value.battery_level
+            offset += 1
         if value.service_required is not None or value.battery_fault is not None:
             flags |= 0x04
-            additional_status = (int(value.service_required or 0) & 0x03) | (
+            buffer[offset] = (int(value.service_required or 0) & 0x03) | (
                 (int(bool(value.battery_fault)) & 0x01) << 2
             )
-            tail += bytes([additional_status])
+            offset += 1
+
+        _pack_into(_BATTERY_LEVEL_STATUS, buffer, start, flags, power_state)
+        return offset
 
-        return bytes([flags]) + power_state.to_bytes(2, "little", signed=False) + tail
+    @classmethod
+    def encode(cls, value: CharacteristicBatteryLevelStatusData) -> bytes:
+        buffer = bytearray(cls.encoded_size(value))
+        cls.encode_into(buffer, 0, value)
+        return bytes(buffer)
 
 
 @dataclass
@@ -766,6 +863,9 @@ class CharacteristicScheduleData:
     contours: set[Contour]
 
 
+_SCHEDULE = Struct("<iiBBB")
+
+
 @dataclass
 class CharacteristicSchedule(Characteristic[CharacteristicScheduleData]):
     @classmethod
@@ -779,14 +879,33 @@ class CharacteristicSchedule(Characteristic[CharacteristicScheduleData]):
         )
 
     @classmethod
-    def encode(cls, value: CharacteristicScheduleData) -> bytes:
-        return (
-            CharacteristicTimeOfDay.encode(value.start_time)
-            + CharacteristicTimeDelta.encode(value.duration)
-            + CharacteristicWeekdays.encode(value.weekdays)
-            + CharacteristicBool.encode(value.active)
-            + CharacteristicContours.encode(value.contours)
+    def encoded_size(cls, value: CharacteristicScheduleData) -> int:
+        return _SCHEDULE.size
+
+    @classmethod
+    def encode_into(
+        cls, buffer: WritableBuffer, offset: int, value: CharacteristicScheduleData
+    ) -> int:
+        _pack_into(
+            _SCHEDULE,
+            buffer,
+            offset,
+            _seconds_of_day(value.start_time),
+            int(value.duration.total_seconds()),
+            _bitmask(value.weekdays),
+            1 if value.active else 0,
+            _bitmask(value.contours),
         )
+        return offset + _SCHEDULE.size
+
+    @classmethod
+    def encode(cls, value: CharacteristicScheduleData) -> bytes:
+        buffer = bytearray(_SCHEDULE.size)
+        cls.encode_into(buffer, 0, value)
+        return bytes(buffer)
+
+
+_catalogs: dict[ProductType, "ServiceCatalog"] = {}
 
 
 class Service:
@@ -799,21 +918,20 @@ class Service:
 
     @classmethod
     def find_service(cls, uuid: str, product_type: ProductType) -> type[Self] | None:
-        services = cls.registry.get(uuid, [])
-        for service in services:
-            if product_type in service.products:
-                return service
-        return None
+        return Service.catalog(product_type).services_by_uuid.get(uuid)
 
     @classmethod
     def services_for_product_type(cls, product_type: ProductType) -> list[type[Self]]:
         """Get all services for a product type."""
-        return [
-            service
-            for services in Service.registry.values()
-            for service in services
-            if product_type in service.products
-        ]
+        return list(Service.catalog(product_type).services)
+
+    @staticmethod
+    def catalog(product_type: ProductType) -> "ServiceCatalog":
+        """Get the shared service catalog of a product type."""
+        if (catalog := _catalogs.get(product_type)) is None:
+            catalog = ServiceCatalog.build(product_type)
+            _catalogs[product_type] = catalog
+        return catalog
 
     def __init_subclass__(cls, /, **kwargs):
         super().__init_subclass__(**kwargs)
@@ -830,6 +948,53 @@ class Service:
             if isinstance(value, Characteristic):
                 cls.characteristics[value.uuid] = value
 
+        _catalogs.clear()
+
+
+@dataclass(frozen=True)
+class ServiceCatalog:
+    """Precomputed lookup tables for the services of a product type."""
+
+    product_type: ProductType
+    services: tuple[type[Service], ...]
+    services_by_uuid: Mapping[str, type[Service]]
+    characteristics_by_uuid: Mapping[str, tuple[Characteristic, ...]]
+    unique_ids: frozenset[str]
+
+    @classmethod
+    def build(cls, product_type: ProductType) -> Self:
+        services = tuple(
+            service
+            for services in Service.registry.values()
+            for service in services
+            if product_type in service.products
+        )
+
+        services_by_uuid: dict[str, type[Service]] = {}
+        characteristics_by_uuid: dict[str, tuple[Characteristic, ...]] = {}
+        for service in services:
+            services_by_uuid.setdefault(service.uuid, service)
+            for char in service.characteristics.values():
+                characteristics_by_uuid[char.uuid] = (
+                    *characteristics_by_uuid.get(char.uuid, ()),
+                    char,
+                )
+
+        return cls(
+            product_type,
+            services,
+            MappingProxyType(services_by_uuid),
+            MappingProxyType(characteristics_by_uuid),
+            frozenset(
+                char.unique_id
+                for service in services
+                for char in service.characteristics.values()
+            ),
+        )
+
+
+_EVENT_HISTORY = Struct("<bbibbi")
+
 
 @dataclass
 class CharacteristicEventHistoryData:
@@ -852,15 +1017,29 @@ class CharacteristicEventHistoryData:
         )
 
     @classmethod
-    def encode(cls, value: Self) -> bytes:
-        return (
-            CharacteristicInt.encode(value.index)
-            + CharacteristicInt.encode(value.total_events)
-            + CharacteristicTime.encode(value.timestamp)
-            + CharacteristicInt.encode(value.schedule_index)
-            + SkipReason.encode(value.skip_reason)
-            + CharacteristicTimeDelta.encode(value.duration)
+    def encoded_size(cls, value: Self) -> int:
+        return _EVENT_HISTORY.size
+
+    @classmethod
+    def encode_into(cls, buffer: WritableBuffer, offset: int, value: Self) -> int:
+        _pack_into(
+            _EVENT_HISTORY,
+            buffer,
+            offset,
+            value.index,
+            value.total_events,
+            int(value.timestamp.replace(tzinfo=timezone.utc).timestamp()),
+            value.schedule_index,
+            value.skip_reason,
+            int(value.duration.total_seconds()),
         )
+        return offset + _EVENT_HISTORY.size
+
+    @classmethod
+    def encode(cls, value: Self) -> bytes:
+        buffer = bytearray(_EVENT_HISTORY.size)
+        cls.encode_into(buffer, 0, value)
+        return bytes(buffer)
 
 
 class CharacteristicEventHistory(Characteristic[CharacteristicEventHistoryData]):
@@ -868,6 +1047,19 @@ class CharacteristicEventHistory(Characteristic[CharacteristicEventHistoryData])
     def decode(cls, data: bytes) -> CharacteristicEventHistoryData:
         return CharacteristicEventHistoryData.decode(data)
 
+    @classmethod
+    def encoded_size(cls, value: CharacteristicEventHistoryData) -> int:
+        return CharacteristicEventHistoryData.encoded_size(value)
+
+    @classmethod
+    def encode_into(
+        cls,
+        buffer: WritableBuffer,
+        offset: int,
+        value: CharacteristicEventHistoryData,
+    ) -> int:
+        return CharacteristicEventHistoryData.encode_into(buffer, offset, value)
+
     @classmethod
     def encode(cls, value: CharacteristicEventHistoryData) -> bytes:
         return CharacteristicEventHistoryData.encode(value)
@@ -922,22 +1114,48 @@ class ManufacturerData:
         return ProductType.from_manufacturer_data(self)
 
     def update(self, data: bytes):
-        value = ManufacturerData.decode_dict(data)
-        info = dict(enumerate(value.get(6, b"")))
-
-        if (data := info.get(0)) is not None:
-            self.group = ProductGroup.enum_or_int(data)
-        if (data := info.get(1)) is not None:
-            if self.group == ProductGroup.WATER_CONTROL:
-                self.model = ProductModelWaterControl.enum_or_int(data)
-            else:
-                self.model = data
-        if (data := info.get(2)) is not None:
-            self.variant = data
-
-        if (data := value.get(4)) is not None:
-            self.serial = int.from_bytes(data, "little")
-        if (data := value.get(5)) is not None:
-            self.pairable = bool.from_bytes(data, "little")
-        if (data := value.get(8)) is not None:
-            self.name = data.partition(b"\x00")[0].decode("utf-8", "replace")
+        for name, value in _decode_manufacturer_fields(bytes(data)):
+            setattr(self, name, value)
+
+    def updated(self, data: bytes) -> "ManufacturerData":
+        """Return manufacturer data with data merged in, copying only on change."""
+        fields = _decode_manufacturer_fields(bytes(data))
+        if all(getattr(self, name) == value for name, value in fields):
+            return self
+        result = replace(self)
+        for name, value in fields:
+            setattr(result, name, value)
+        return result
+
+
+@lru_cache(maxsize=MANUFACTURER_DATA_CACHE_SIZE)
+def _decode_manufacturer_fields(data: bytes) -> tuple[tuple[str, object], ...]:
+    """Decode the fields present in a raw manufacturer data payload.
+
+    Devices repeat a handful of payloads, so results are memoized per raw
+    payload and :meth:`ManufacturerData.update` only needs to merge them.
+    """
+    value = ManufacturerData.decode_dict(data)
+    info = dict(enumerate(value.get(6, b"")))
+    fields: list[tuple[str, object]] = []
+
+    group = None
+    if (data := info.get(0)) is not None:
+        group = ProductGroup.enum_or_int(data)
+        fields.append(("group", group))
+    if (data := info.get(1)) is not None:
+        if group == ProductGroup.WATER_CONTROL:
+            fields.append(("model", ProductModelWaterControl.enum_or_int(data)))
+        else:
+            fields.append(("model", data))
+    if (data := info.get(2)) is not None:
+        fields.append(("variant", data))
+
+    if (data := value.get(4)) is not None:
+        fields.append(("serial", int.from_bytes(data, "little")))
+    if (data := value.get(5)) is not None:
+        fields.append(("pairable", bool.from_bytes(data, "little")))
+    if (data := value.get(8)) is not None:
+        fields.append(("name", data.partition(b"\x00")[0].decode("utf-8", "replace")))
+
+    return tuple(fields)
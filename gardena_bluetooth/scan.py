@@ -1,17 +1,38 @@
 import asyncio
 import contextlib
 import dataclasses
+import itertools
 import logging
-from collections.abc import AsyncGenerator
+import time
+import weakref
+from collections import OrderedDict
+from collections.abc import AsyncGenerator, AsyncIterator, Callable, Collection
+from enum import Enum, auto
+from functools import partial
+from typing import Any, ClassVar
 
 from bleak import AdvertisementData, BaseBleakScanner, BleakScanner, BLEDevice
+from bleak.args.bluez import OrPattern
+from bleak.assigned_numbers import AdvertisementDataType
 
+from . import register_uuid_names
+from .cache import ManufacturerDataCache
+from .const import ScanService
 from .parse import ManufacturerData
 
 LOGGER = logging.getLogger(__name__)
 
+_background_tasks: set[asyncio.Task] = set()
+
 DEFAULT_MANUFACTURER_DATA_PRODUCT_TYPE_FIELDS = {"group", "model", "variant"}
 DEFAULT_MANUFACTURER_DATA_TIMEOUT = 15.0
+DEFAULT_MAX_DEVICES = 1024
+DEFAULT_IDLE_TIMEOUT = 600.0
+DEFAULT_QUEUE_SIZE = 256
+DEFAULT_FRESHNESS = 60.0
+DEFAULT_MIN_WINDOW = 2.0
+DEFAULT_INTERVAL_MARGIN = 2.0
+DEFAULT_SIGHTING_WINDOW = 10.0
 
 
 @dataclasses.dataclass
@@ -21,8 +42,266 @@ class ScanResult:
     ble_device: BLEDevice
 
 
+@dataclasses.dataclass(frozen=True)
+class ScanOptions:
+    """Filtering done by the scanner backend, where supported.
+
+    Passive scanning does not request scan responses. On BlueZ it also
+    makes the controller only report advertisements carrying manufacturer
+    data of Husqvarna. The service uuids limit reported devices to those
+    advertising one of the services. Advertisements are still checked for
+    manufacturer data, for backends that do not filter.
+    """
+
+    passive: bool = False
+    service_uuids: tuple[str, ...] | None = None
+    adapters: tuple[str, ...] | None = None
+    """Adapters to scan on, each with its own scanner, or the default one."""
+
+    def scanner_kwargs(self) -> dict[str, Any]:
+        """Arguments for BleakScanner implementing the options."""
+        kwargs: dict[str, Any] = {}
+        if self.service_uuids:
+            kwargs["service_uuids"] = list(self.service_uuids)
+        if self.passive:
+            kwargs["scanning_mode"] = "passive"
+            kwargs["bluez"] = {
+                "or_patterns": [
+                    OrPattern(
+                        0,
+                        AdvertisementDataType.MANUFACTURER_SPECIFIC_DATA,
+                        ManufacturerData.company.to_bytes(2, "little"),
+                    )
+                ]
+            }
+        return kwargs
+
+
+def _create_scanners(
+    backend: type[BaseBleakScanner] | None,
+    options: ScanOptions,
+    callback: Callable[[str | None, BLEDevice, AdvertisementData], None],
+) -> list[BleakScanner]:
+    """Create one scanner per adapter, calling back with the adapter name."""
+    kwargs = options.scanner_kwargs()
+    if not options.adapters:
+        return [
+            BleakScanner(
+                backend=backend, detection_callback=partial(callback, None), **kwargs
+            )
+        ]
+    return [
+        BleakScanner(
+            backend=backend,
+            detection_callback=partial(callback, adapter),
+            adapter=adapter,
+            **kwargs,
+        )
+        for adapter in options.adapters
+    ]
+
+
+async def _start_scanners(scanners: list[BleakScanner]) -> None:
+    started: list[BleakScanner] = []
+    try:
+        for scanner in scanners:
+            await scanner.start()
+            started.append(scanner)
+    except BaseException:
+        await _stop_scanners(started)
+        raise
+
+
+async def _stop_scanners(scanners: list[BleakScanner]) -> None:
+    for scanner in scanners:
+        await scanner.stop()
+
+
+SCAN_DEFAULT = ScanOptions()
+SCAN_PASSIVE = ScanOptions(passive=True)
+SCAN_SERVICE = ScanOptions(service_uuids=(ScanService,))
+
+
+@dataclasses.dataclass(slots=True)
+class AdapterSighting:
+    """Strongest recent advertisement of a device through one adapter."""
+
+    adapter: str
+    device: BLEDevice
+    rssi: int
+    time: float
+
+
+@dataclasses.dataclass(slots=True)
+class _DeviceEntry[T]:
+    value: T
+    last_seen: float
+
+
+class DeviceTable[T]:
+    """Per address state of seen devices, bounded in size and idle time.
+
+    Entries are kept in least recently seen order, so the oldest entry is
+    evicted when the table is full, and entries not seen for longer than
+    the idle timeout expire.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], T],
+        max_size: int = DEFAULT_MAX_DEVICES,
+        idle_timeout: float | None = DEFAULT_IDLE_TIMEOUT,
+    ) -> None:
+        self._factory = factory
+        self._entries: OrderedDict[str, _DeviceEntry[T]] = OrderedDict()
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, address: str) -> bool:
+        return address in self._entries
+
+    def get(self, address: str) -> T | None:
+        if entry := self._entries.get(address):
+            return entry.value
+        return None
+
+    def set(self, address: str, value: T) -> None:
+        """Replace the value of an already seen address."""
+        self._entries[address].value = value
+
+    def seen(self, address: str, now: float) -> T:
+        """Mark address as seen, creating its entry if needed."""
+        if (entry := self._entries.get(address)) is None:
+            entry = _DeviceEntry(self._factory(), now)
+            self._entries[address] = entry
+        else:
+            entry.last_seen = now
+            self._entries.move_to_end(address)
+        self.expire(now)
+        return entry.value
+
+    def expire(self, now: float) -> None:
+        """Evict entries above max size, or idle for too long."""
+        entries = self._entries
+        while len(entries) > self.max_size:
+            entries.popitem(last=False)
+
+        if self.idle_timeout is None:
+            return
+        deadline = now - self.idle_timeout
+        while entries:
+            address, entry = next(iter(entries.items()))
+            if entry.last_seen >= deadline:
+                break
+            del entries[address]
+
+
+@dataclasses.dataclass(slots=True)
+class _Emission:
+    """What was last emitted for a device, in change only mode."""
+
+    manufacturer_data: ManufacturerData | None = None
+    time: float = 0.0
+    rssi: int | None = None
+
+    def should_emit(
+        self,
+        manufacturer_data: ManufacturerData,
+        rssi: int,
+        now: float,
+        heartbeat: float | None,
+        rssi_delta: int | None,
+    ) -> bool:
+        if self.manufacturer_data != manufacturer_data:
+            return True
+        if heartbeat is not None and now - self.time >= heartbeat:
+            return True
+        if (
+            rssi_delta is not None
+            and self.rssi is not None
+            and abs(rssi - self.rssi) >= rssi_delta
+        ):
+            return True
+        return False
+
+
+class QueueOverflow(Enum):
+    DROP_OLDEST = auto()
+    """Drop the oldest queued advertisement to make room."""
+
+    COALESCE = auto()
+    """Keep only the latest queued advertisement per address."""
+
+
+def _device_address(item) -> str:
+    return item[0].address
+
+
+class AdvertisementQueue[T]:
+    """Bounded queue of advertisements, with a policy for when it is full.
+
+    A maxsize of zero makes the queue unbounded. Advertisements that are
+    dropped or coalesced because the consumer fell behind are counted. The
+    address callable gives the device address of a queued item, which
+    defaults to the first element of a (device, advertisement) tuple.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_QUEUE_SIZE,
+        overflow: QueueOverflow = QueueOverflow.DROP_OLDEST,
+        address: Callable[[T], str] = _device_address,
+    ) -> None:
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.dropped = 0
+        self.coalesced = 0
+        self._address = address
+        self._items: OrderedDict[object, T] = OrderedDict()
+        self._keys = itertools.count()
+        self._event = asyncio.Event()
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    def empty(self) -> bool:
+        return not self._items
+
+    def put_nowait(self, item: T) -> None:
+        items = self._items
+        if self.overflow is QueueOverflow.COALESCE:
+            key: object = self._address(item)
+            if key in items:
+                items[key] = item
+                self.coalesced += 1
+                return
+        else:
+            key = next(self._keys)
+
+        if self.maxsize and len(items) >= self.maxsize:
+            items.popitem(last=False)
+            self.dropped += 1
+        items[key] = item
+        self._event.set()
+
+    async def get(self) -> T:
+        while not self._items:
+            self._event.clear()
+            await self._event.wait()
+        return self._items.popitem(last=False)[1]
+
+
 @contextlib.asynccontextmanager
-async def advertisement_queue(backend: type[BaseBleakScanner] | None = None):
+async def advertisement_queue(
+    backend: type[BaseBleakScanner] | None = None,
+    *,
+    maxsize: int = DEFAULT_QUEUE_SIZE,
+    overflow: QueueOverflow = QueueOverflow.DROP_OLDEST,
+    options: ScanOptions = SCAN_DEFAULT,
+):
     """
     Context manager for BleakScanner
 
@@ -35,44 +314,585 @@ async def advertisement_queue(backend: type[BaseBleakScanner] | None = None):
     support it. See https://github.com/Bluetooth-Devices/habluetooth/issues/380
     """
 
-    queue = asyncio.Queue[tuple[BLEDevice, AdvertisementData]]()
+    register_uuid_names()
+    queue = AdvertisementQueue[tuple[BLEDevice, AdvertisementData]](maxsize, overflow)
 
-    def _callback(device, advertisement):
+    def _callback(adapter, device, advertisement):
         queue.put_nowait((device, advertisement))
 
-    scanner = BleakScanner(backend=backend, detection_callback=_callback)
+    scanners = _create_scanners(backend, options, _callback)
 
-    await scanner.start()
+    await _start_scanners(scanners)
     try:
         yield queue
     finally:
-        await scanner.stop()
+        await _stop_scanners(scanners)
+        if queue.dropped or queue.coalesced:
+            LOGGER.debug(
+                "Advertisement queue dropped %d and coalesced %d advertisements",
+                queue.dropped,
+                queue.coalesced,
+            )
+
+
+class ScannerHub:
+    """One scanner shared by all concurrent consumers.
+
+    The scanner is started when the first consumer attaches and stopped
+    when the last one leaves. Manufacturer data is accumulated once per
+    device in a shared table, and each consumer receives results for the
+    addresses it asked for in its own queue.
+
+    Entries of the shared table are replaced rather than modified when an
+    advertisement changes them, so a queued result keeps the manufacturer
+    data as it was when the advertisement arrived.
+
+    Advertisements from addresses no consumer asked for are dropped before
+    being parsed. When scanning on several adapters, results are merged per
+    address, and the strongest sighting through each adapter within the
+    last sighting_window seconds is kept in sightings, so a single weak
+    packet does not hide a good adapter. The latest result of every
+    device is kept in results.
+
+    The tables are bounded by the largest max_devices and idle_timeout of the
+    attached consumers. Hubs are shared per event loop, while they have
+    consumers or are held with acquire, so a scan started after the last
+    user left begins from an empty table.
+    """
+
+    _hubs: ClassVar[
+        weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop,
+            dict[tuple[type[BaseBleakScanner] | None, ScanOptions], "ScannerHub"],
+        ]
+    ] = weakref.WeakKeyDictionary()
+
+    def __init__(
+        self,
+        backend: type[BaseBleakScanner] | None = None,
+        *,
+        options: ScanOptions = SCAN_DEFAULT,
+        max_devices: int = DEFAULT_MAX_DEVICES,
+        idle_timeout: float | None = DEFAULT_IDLE_TIMEOUT,
+        sighting_window: float = DEFAULT_SIGHTING_WINDOW,
+    ) -> None:
+        self.backend = backend
+        self.options = options
+        self.sighting_window = sighting_window
+        self.devices = DeviceTable(ManufacturerData, max_devices, idle_timeout)
+        self._consumers: dict[
+            AdvertisementQueue[ScanResult], frozenset[str] | None
+        ] = {}
+        self._limits: dict[
+            AdvertisementQueue[ScanResult], tuple[int, float | None]
+        ] = {}
+        self._allowed: frozenset[str] | None = frozenset()
+        self.sightings = DeviceTable[dict[str, AdapterSighting]](
+            dict, max_devices, idle_timeout
+        )
+        self.results = DeviceTable[ScanResult | None](
+            lambda: None, max_devices, idle_timeout
+        )
+        self._scanners: list[BleakScanner] = []
+        self._paused = 0
+        self._holders = 0
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def get(
+        cls,
+        backend: type[BaseBleakScanner] | None = None,
+        options: ScanOptions = SCAN_DEFAULT,
+    ) -> "ScannerHub":
+        """Get the shared hub of the running loop for a backend and options."""
+        hubs = cls._hubs.setdefault(asyncio.get_running_loop(), {})
+        key = (backend, options)
+        if (hub := hubs.get(key)) is None:
+            hub = hubs[key] = cls(backend, options=options)
+        return hub
+
+    @classmethod
+    def shared(
+        cls,
+        backend: type[BaseBleakScanner] | None = None,
+        options: ScanOptions = SCAN_DEFAULT,
+    ) -> "ScannerHub | None":
+        """Get the shared hub of the running loop, without creating one."""
+        return cls._hubs.get(asyncio.get_running_loop(), {}).get((backend, options))
+
+    def _register(self) -> None:
+        hubs = self._hubs.setdefault(asyncio.get_running_loop(), {})
+        hubs.setdefault((self.backend, self.options), self)
+
+    def _unregister_unused(self) -> None:
+        if self._consumers or self._holders:
+            return
+        hubs = self._hubs.get(asyncio.get_running_loop(), {})
+        key = (self.backend, self.options)
+        if hubs.get(key) is self:
+            del hubs[key]
+
+    def acquire(self) -> None:
+        """Keep the hub shared, with its tables, while it has no consumers.
+
+        For long lived owners attaching consumers on and off, so consumers
+        attaching in between share this hub rather than starting another
+        scanner. Every acquire must be paired with a release.
+        """
+        self._register()
+        self._holders += 1
+
+    def release(self) -> None:
+        self._holders -= 1
+        self._unregister_unused()
+
+    def seed(self, address: str, manufacturer_data: ManufacturerData) -> None:
+        """Provide known manufacturer data for a device not yet seen."""
+        if address not in self.devices:
+            self.devices.seen(address, time.monotonic())
+            self.devices.set(address, manufacturer_data)
+
+    @property
+    def running(self) -> bool:
+        return bool(self._scanners)
+
+    @property
+    def consumers(self) -> int:
+        return len(self._consumers)
+
+    def _update_allowed(self) -> None:
+        allowed: set[str] = set()
+        for addresses in self._consumers.values():
+            if addresses is None:
+                self._allowed = None
+                return
+            allowed |= addresses
+        self._allowed = frozenset(allowed)
+
+    def _update_limits(self) -> None:
+        if not self._limits:
+            return
+        max_devices = max(limit[0] for limit in self._limits.values())
+        idle_timeouts = [limit[1] for limit in self._limits.values()]
+        idle_timeout = None if None in idle_timeouts else max(idle_timeouts)
+        for table in (self.devices, self.sightings, self.results):
+            table.max_size = max_devices
+            table.idle_timeout = idle_timeout
+
+    def _callback(
+        self,
+        adapter: str | None,
+        device: BLEDevice,
+        advertisement: AdvertisementData,
+    ):
+        if self._allowed is not None and device.address not in self._allowed:
+            return
+
+        payload = advertisement.manufacturer_data.get(ManufacturerData.company)
+        if payload is None:
+            return
+
+        address = device.address
+        now = time.monotonic()
+        if adapter is not None:
+            sightings = self.sightings.seen(address, now)
+            last = sightings.get(adapter)
+            if (
+                last is None
+                or advertisement.rssi >= last.rssi
+                or now - last.time > self.sighting_window
+            ):
+                sightings[adapter] = AdapterSighting(
+                    adapter, device, advertisement.rssi, now
+                )
+        current = self.devices.seen(address, now)
+        manufacturer_data = current.updated(payload)
+        if manufacturer_data is not current:
+            self.devices.set(address, manufacturer_data)
+
+        result = ScanResult(manufacturer_data, advertisement, device)
+        self.results.seen(address, now)
+        self.results.set(address, result)
+        for queue, addresses in self._consumers.items():
+            if addresses is None or address in addresses:
+                queue.put_nowait(result)
+
+    async def _start(self) -> None:
+        if self._scanners or self._paused or not self._consumers:
+            return
+        register_uuid_names()
+        scanners = _create_scanners(self.backend, self.options, self._callback)
+        await _start_scanners(scanners)
+        self._scanners = scanners
+
+    async def _stop(self) -> None:
+        scanners, self._scanners = self._scanners, []
+        await _stop_scanners(scanners)
+
+    @contextlib.asynccontextmanager
+    async def paused(self) -> AsyncIterator[None]:
+        """Stop the scanner while in context, leaving radio time to connections.
+
+        Consumers stay attached, and the scanner is started again when the
+        last pause ends. The hub is held while paused, so consumers
+        attaching meanwhile wait for it instead of starting another scanner.
+        """
+        self.acquire()
+        try:
+            async with self._lock:
+                self._paused += 1
+                await self._stop()
+            try:
+                yield
+            finally:
+                async with self._lock:
+                    self._paused -= 1
+                    await self._start()
+        finally:
+            self.release()
+
+    @contextlib.asynccontextmanager
+    async def consume(
+        self,
+        addresses: Collection[str] | None = None,
+        *,
+        maxsize: int = DEFAULT_QUEUE_SIZE,
+        overflow: QueueOverflow = QueueOverflow.DROP_OLDEST,
+        max_devices: int = DEFAULT_MAX_DEVICES,
+        idle_timeout: float | None = DEFAULT_IDLE_TIMEOUT,
+    ) -> AsyncIterator[AdvertisementQueue[ScanResult]]:
+        """Attach a consumer, receiving results for advertisements of devices.
+
+        Only results from the given addresses are queued, or from any
+        device if addresses is None. When the last consumer leaves, the hub
+        is no longer shared, and the next get returns a new hub.
+        """
+        queue = AdvertisementQueue[ScanResult](
+            maxsize, overflow, lambda result: result.ble_device.address
+        )
+        self._register()
+        self._consumers[queue] = None if addresses is None else frozenset(addresses)
+        self._limits[queue] = (max_devices, idle_timeout)
+        self._update_allowed()
+        self._update_limits()
+        try:
+            async with self._lock:
+                await self._start()
+            yield queue
+        finally:
+            del self._consumers[queue]
+            del self._limits[queue]
+            self._update_allowed()
+            self._update_limits()
+            async with self._lock:
+                if not self._consumers:
+                    await self._stop()
+                    self._unregister_unused()
+            if queue.dropped or queue.coalesced:
+                LOGGER.debug(
+                    "Consumer queue dropped %d and coalesced %d advertisements",
+                    queue.dropped,
+                    queue.coalesced,
+                )
+
+
+class ScanScheduler:
+    """Run the scanner in duty cycles, just long enough to hear every device.
+
+    The advertisement interval of each device is learned while scanning,
+    and every freshness seconds the scanner runs for a window of the
+    longest interval times margin, so each known device is heard at least
+    once per cycle. A device missed in a window widens its interval. Until
+    intervals are known, or when the window would fill the cycle, the
+    scanner runs continuously.
+
+    Results are passed to callback, and the manufacturer data accumulated
+    in the table of the hub.
+    """
+
+    def __init__(
+        self,
+        hub: ScannerHub,
+        *,
+        freshness: float = DEFAULT_FRESHNESS,
+        min_window: float = DEFAULT_MIN_WINDOW,
+        margin: float = DEFAULT_INTERVAL_MARGIN,
+        smoothing: float = 0.25,
+        callback: Callable[[ScanResult], None] | None = None,
+    ) -> None:
+        self.hub = hub
+        self.freshness = freshness
+        self.min_window = min_window
+        self.margin = margin
+        self.smoothing = smoothing
+        self.callback = callback
+        self.intervals: dict[str, float] = {}
+        self._window_seen: dict[str, float] = {}
+        self._last_seen: dict[str, float] = {}
+
+    @property
+    def window(self) -> float:
+        """Scan time needed per cycle to hear every known device."""
+        if not self.intervals:
+            return self.freshness
+        window = max(self.intervals.values()) * self.margin
+        return min(self.freshness, max(self.min_window, window))
+
+    def observe(self, address: str, now: float) -> None:
+        """Record a sighting, learning the interval from the previous one.
+
+        Only sightings within the same window are used, since gaps while
+        the scanner is off say nothing about the interval.
+        """
+        last = self._window_seen.get(address)
+        self._window_seen[address] = now
+        self._last_seen[address] = now
+        if last is None:
+            return
+        interval = now - last
+        if (previous := self.intervals.get(address)) is not None:
+            interval = previous + self.smoothing * (interval - previous)
+        self.intervals[address] = interval
+
+    def _begin_window(self) -> None:
+        self._window_seen.clear()
+
+    def _end_window(self, window: float, now: float) -> None:
+        # A window cut short by a pause can't tell that a device was missed
+        missed = self.hub.running
+        idle_timeout = self.hub.devices.idle_timeout
+        for address, interval in list(self.intervals.items()):
+            last = self._last_seen.get(address)
+            if idle_timeout is not None and last is not None:
+                if now - last > idle_timeout:
+                    del self.intervals[address]
+                    del self._last_seen[address]
+                    continue
+            if missed and address not in self._window_seen:
+                self.intervals[address] = max(interval, window)
+
+    async def _listen(self, queue: AdvertisementQueue[ScanResult], window: float):
+        loop = asyncio.get_running_loop()
+        self._begin_window()
+        with contextlib.suppress(TimeoutError):
+            async with asyncio.timeout(window):
+                while True:
+                    result = await queue.get()
+                    self.observe(result.ble_device.address, loop.time())
+                    if self.callback:
+                        self.callback(result)
+        self._end_window(window, loop.time())
+
+    async def run(self) -> None:
+        """Scan in duty cycles until cancelled.
+
+        The hub is held for the whole run, so lookups made while the
+        scanner is off between windows share it.
+        """
+        loop = asyncio.get_running_loop()
+        self.hub.acquire()
+        try:
+            while True:
+                async with self.hub.consume() as queue:
+                    while True:
+                        started = loop.time()
+                        window = self.window
+                        await self._listen(queue, window)
+                        if window < self.freshness:
+                            break
+                LOGGER.debug("Scanned for %.1fs, intervals %s", window, self.intervals)
+                await asyncio.sleep(max(0.0, self.freshness - (loop.time() - started)))
+        finally:
+            self.hub.release()
+
+    def paused(self) -> contextlib.AbstractAsyncContextManager[None]:
+        """Pause scanning during connection heavy work.
+
+        Pauses the hub shared for the backend and options of this
+        scheduler, which other lookups attach to.
+        """
+        hub = ScannerHub.shared(self.hub.backend, self.hub.options) or self.hub
+        return hub.paused()
 
 
 async def async_scan_devices(
     backend: type[BaseBleakScanner] | None = None,
+    *,
+    addresses: Collection[str] | None = None,
+    options: ScanOptions = SCAN_DEFAULT,
+    max_devices: int = DEFAULT_MAX_DEVICES,
+    idle_timeout: float | None = DEFAULT_IDLE_TIMEOUT,
+    only_changes: bool = False,
+    heartbeat: float | None = None,
+    rssi_delta: int | None = None,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    overflow: QueueOverflow = QueueOverflow.DROP_OLDEST,
 ) -> AsyncGenerator[ScanResult]:
-    devices: dict[str, ScanResult] = {}
-    """Async iterator that accumulate manufacturer data of devices."""
+    """Async iterator that accumulate manufacturer data of devices.
+
+    The scanner and the accumulated manufacturer data are shared with other
+    consumers through the ScannerHub of the backend and scan options. Only
+    advertisements from the given addresses are yielded, or from any device
+    if addresses is None.
+
+    By default a result is yielded for every advertisement. With
+    only_changes, a device is only yielded when its decoded manufacturer
+    data changed, when heartbeat seconds passed since it was last yielded,
+    or when its signal strength moved by at least rssi_delta. What was last
+    yielded is kept per device, in a table holding at most max_devices
+    entries, which forgets devices not heard from within idle_timeout seconds.
+    The same limits bound the manufacturer data table of the hub.
+
+    Advertisements waiting for the consumer are held in a queue of at most
+    queue_size entries, handling overflow according to the overflow policy.
+    """
+    hub = ScannerHub.get(backend, options)
+    emitted = DeviceTable(_Emission, max_devices, idle_timeout)
 
-    async with advertisement_queue(backend) as queue:
+    async with hub.consume(
+        addresses,
+        maxsize=queue_size,
+        overflow=overflow,
+        max_devices=max_devices,
+        idle_timeout=idle_timeout,
+    ) as queue:
         while True:
-            device, advertisement = await queue.get()
+            result = await queue.get()
 
-            if ManufacturerData.company not in advertisement.manufacturer_data:
-                continue
+            if only_changes:
+                now = time.monotonic()
+                rssi = result.advertisement.rssi
+                emission = emitted.seen(result.ble_device.address, now)
+                if not emission.should_emit(
+                    result.manufacturer_data, rssi, now, heartbeat, rssi_delta
+                ):
+                    continue
+                emission.manufacturer_data = result.manufacturer_data
+                emission.time = now
+                emission.rssi = rssi
 
-            data = devices.get(device.address)
-            if data is None:
-                data = ScanResult(ManufacturerData(), advertisement, device)
-                devices[device.address] = data
+            yield result
 
-            data.ble_device = device
-            data.advertisement = advertisement
-            data.manufacturer_data.update(
-                advertisement.manufacturer_data.get(ManufacturerData.company, b"")
-            )
-            yield data
+
+def _has_fields(manufacturer_data: ManufacturerData, fields: set[str]) -> bool:
+    return all(getattr(manufacturer_data, field, None) is not None for field in fields)
+
+
+class DeviceProgress:
+    """Async iterator yielding devices as soon as their select fields are known.
+
+    Iteration ends when every address is complete, or when the timeout
+    passes. Addresses not complete by then remain in pending, and those
+    never seen at all in missing. The latest result of every seen device,
+    complete or not, is kept in devices.
+
+    Devices already complete in the shared hub, such as one held by a
+    running ScanScheduler, are yielded at once without waiting for an
+    advertisement.
+
+    Use as an async context manager, so the scanner is released if
+    iteration is stopped early.
+    """
+
+    def __init__(
+        self,
+        addresses: Collection[str],
+        *,
+        fields: set[str] = DEFAULT_MANUFACTURER_DATA_PRODUCT_TYPE_FIELDS,
+        timeout: float | None = DEFAULT_MANUFACTURER_DATA_TIMEOUT,
+        backend: type[BaseBleakScanner] | None = None,
+        options: ScanOptions = SCAN_DEFAULT,
+        cache: ManufacturerDataCache | None = None,
+    ) -> None:
+        self.addresses = frozenset(addresses)
+        self.fields = fields
+        self.timeout = timeout
+        self.backend = backend
+        self.options = options
+        self.cache = cache
+        self.devices: dict[str, ScanResult] = {}
+        self.complete: set[str] = set()
+        self.timed_out = False
+        self._generator = self._iterate()
+
+    @property
+    def pending(self) -> set[str]:
+        """Addresses not yet complete."""
+        return set(self.addresses - self.complete)
+
+    @property
+    def missing(self) -> set[str]:
+        """Addresses not seen at all."""
+        return set(self.addresses - self.devices.keys())
+
+    def __aiter__(self) -> "DeviceProgress":
+        return self
+
+    async def __anext__(self) -> ScanResult:
+        return await anext(self._generator)
+
+    async def aclose(self) -> None:
+        await self._generator.aclose()
+
+    async def __aenter__(self) -> "DeviceProgress":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def _iterate(self) -> AsyncGenerator[ScanResult]:
+        if not self.addresses:
+            return
+
+        hub = ScannerHub.get(self.backend, self.options)
+        if self.cache is not None:
+            for address in self.addresses:
+                if (manufacturer_data := self.cache.get(address)) is not None:
+                    hub.seed(address, manufacturer_data)
+
+        loop = asyncio.get_running_loop()
+        deadline = None if self.timeout is None else loop.time() + self.timeout
+
+        try:
+            for address in self.addresses:
+                if (result := hub.results.get(address)) is None:
+                    continue
+                self.devices[address] = result
+                if _has_fields(result.manufacturer_data, self.fields):
+                    self.complete.add(address)
+                    yield result
+            if not self.pending:
+                return
+
+            async with hub.consume(self.addresses) as queue:
+                while self.pending:
+                    # The deadline only applies while waiting, so it never
+                    # fires inside the code of the consumer of a result.
+                    try:
+                        async with asyncio.timeout_at(deadline):
+                            result = await queue.get()
+                    except TimeoutError:
+                        self.timed_out = True
+                        LOGGER.debug(
+                            "Devices not found %s, incomplete %s",
+                            self.missing,
+                            self.pending,
+                        )
+                        return
+
+                    address = result.ble_device.address
+                    self.devices[address] = result
+                    if address in self.complete or not _has_fields(
+                        result.manufacturer_data, self.fields
+                    ):
+                        continue
+
+                    self.complete.add(address)
+                    yield result
+        finally:
+            if self.cache is not None:
+                for address, result in self.devices.items():
+                    self.cache.update(address, result.manufacturer_data)
 
 
 async def async_get_devices(
@@ -81,41 +901,56 @@ async def async_get_devices(
     fields: set[str] = DEFAULT_MANUFACTURER_DATA_PRODUCT_TYPE_FIELDS,
     timeout: float | None = DEFAULT_MANUFACTURER_DATA_TIMEOUT,
     backend: type[BaseBleakScanner] | None = None,
+    options: ScanOptions = SCAN_DEFAULT,
+    cache: ManufacturerDataCache | None = None,
 ) -> dict[str, ScanResult]:
-    """Wait for enough packets of manufacturer data to get select fields, or timeout."""
-    devices: dict[str, ScanResult] = {}
-    done: set[str] = set()
+    """Wait for enough packets of manufacturer data to get select fields, or timeout.
 
-    if not addresses:
-        return devices
+    With a cache, known manufacturer data of the devices is used as a
+    starting point, so a device is usually complete on its first
+    advertisement, and the cache is updated with the results. Devices
+    already known to the shared hub are returned without waiting.
 
-    try:
-        async with asyncio.timeout(timeout):
-            async for result in async_scan_devices(backend):
-                if result.ble_device.address not in addresses:
-                    continue
+    Raises TimeoutError if any of the addresses was never seen. Use
+    DeviceProgress to get each device as soon as it is complete instead.
+    """
+    async with DeviceProgress(
+        addresses,
+        fields=fields,
+        timeout=timeout,
+        backend=backend,
+        options=options,
+        cache=cache,
+    ) as progress:
+        async for _ in progress:
+            pass
 
-                devices[result.ble_device.address] = result
-                if any(
-                    getattr(result.manufacturer_data, field, None) is None
-                    for field in fields
-                ):
-                    continue
+    if missing := progress.missing:
+        LOGGER.debug("One or more of the requested address was not found: %s", missing)
+        raise TimeoutError(f"Devices not found: {', '.join(sorted(missing))}")
 
-                done.add(result.ble_device.address)
-                if done == addresses:
-                    break
+    LOGGER.debug("Device data %s, incomplete %s", progress.devices, progress.pending)
+    return progress.devices
 
+
+async def _async_refresh_devices(addresses: set[str], **kwargs: Any) -> None:
+    try:
+        await async_get_devices(addresses, **kwargs)
     except TimeoutError:
-        missing = addresses - devices.keys()
-        if missing:
-            LOGGER.debug(
-                "One or more of the requested address was not found: %s", missing
-            )
-            raise
+        LOGGER.debug("Unable to refresh cached devices %s", addresses)
+    except Exception:
+        LOGGER.exception("Failed to refresh cached devices %s", addresses)
+
 
-    LOGGER.debug("Device data %s, incomplete %s", devices, addresses - done)
-    return devices
+async def async_cancel_refresh() -> None:
+    """Cancel background refreshes started by async_get_manufacturer_data.
+
+    Call on shutdown, so no scan outlives the application.
+    """
+    tasks = list(_background_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
 
 
 async def async_get_manufacturer_data(
@@ -124,11 +959,38 @@ async def async_get_manufacturer_data(
     fields: set[str] = DEFAULT_MANUFACTURER_DATA_PRODUCT_TYPE_FIELDS,
     timeout: float = DEFAULT_MANUFACTURER_DATA_TIMEOUT,
     backend: type[BaseBleakScanner] | None = None,
+    options: ScanOptions = SCAN_DEFAULT,
+    cache: ManufacturerDataCache | None = None,
 ) -> dict[str, ManufacturerData]:
-    devices = await async_get_devices(
-        addresses, fields=fields, timeout=timeout, backend=backend
-    )
-    return {
-        address: scan_result.manufacturer_data
-        for address, scan_result in devices.items()
+    """Get manufacturer data of devices, with select fields filled if possible.
+
+    With a cache, devices with fresh cached data are returned at once and
+    refreshed by a background scan. Only the others are waited for. Cancel
+    pending refreshes with async_cancel_refresh on shutdown.
+    """
+    kwargs: dict[str, Any] = {
+        "fields": fields,
+        "timeout": timeout,
+        "backend": backend,
+        "options": options,
+        "cache": cache,
     }
+    result: dict[str, ManufacturerData] = {}
+    if cache is not None:
+        for address in addresses:
+            manufacturer_data = cache.get(address)
+            if manufacturer_data is not None and _has_fields(manufacturer_data, fields):
+                result[address] = manufacturer_data
+
+        if result:
+            task = asyncio.create_task(_async_refresh_devices(set(result), **kwargs))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+
+    if missing := addresses - result.keys():
+        devices = await async_get_devices(missing, **kwargs)
+        result.update(
+            (address, scan_result.manufacturer_data)
+            for address, scan_result in devices.items()
+        )
+    return result
@@ -0,0 +1,363 @@
+"""In-process simulated Gardena devices.
+
+A SimulatedDevice serves the services and characteristics of its product
+type with representative encoded values. SimulatedClient behaves like a
+connected BleakClient, and is created by :func:`connect_simulated`, which
+plugs into CachedConnection as connector.
+"""
+
+import asyncio
+import logging
+import random
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from bleak import AdvertisementData, BLEDevice
+from bleak.backends.characteristic import BleakGATTCharacteristic
+from bleak.backends.service import BleakGATTService, BleakGATTServiceCollection
+from bleak.exc import BleakError
+from bleak.uuids import normalize_uuid_str
+
+from . import const  # noqa: F401 - populates the registries
+from .parse import (
+    Characteristic,
+    CharacteristicBatteryLevelStatus,
+    CharacteristicBool,
+    CharacteristicBytes,
+    CharacteristicContours,
+    CharacteristicErrorData,
+    CharacteristicEventHistory,
+    CharacteristicInt,
+    CharacteristicIntArray,
+    CharacteristicIntKeys,
+    CharacteristicLong,
+    CharacteristicLongArray,
+    CharacteristicNullString,
+    CharacteristicNullStringUf8,
+    CharacteristicPnpId,
+    CharacteristicSchedule,
+    CharacteristicSMP,
+    CharacteristicStartStopWatering,
+    CharacteristicString,
+    CharacteristicTime,
+    CharacteristicTimeArray,
+    CharacteristicTimeDelta,
+    CharacteristicTimeOfDay,
+    CharacteristicUInt16,
+    CharacteristicUInt16Array,
+    CharacteristicUInt16PairArray,
+    CharacteristicWeekdays,
+    ManufacturerData,
+    ProductType,
+    Service,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MTU = 247
+ATT_HEADER_SIZE = 3
+
+SAMPLES: dict[type[Characteristic], bytes] = {
+    CharacteristicBatteryLevelStatus: bytes.fromhex("07a3022a004d00"),
+    CharacteristicBool: b"\x01",
+    CharacteristicBytes: bytes.fromhex("0102030405060708"),
+    CharacteristicContours: b"\x05",
+    CharacteristicErrorData: bytes.fromhex("0101c32caf6901"),
+    CharacteristicEventHistory: bytes.fromhex("0105a0b1c3650203102e0000"),
+    CharacteristicInt: b"\x2a",
+    CharacteristicIntArray: bytes.fromhex("0102030405"),
+    CharacteristicIntKeys: b"0='10',1='3600'",
+    CharacteristicLong: (3600).to_bytes(4, "little"),
+    CharacteristicLongArray: bytes.fromhex("100e0000200e0000300e0000"),
+    CharacteristicNullString: b"Contour\x00\x00\x00\x00\x00",
+    CharacteristicNullStringUf8: "Trädgård".encode() + b"\x00\x00\x00",
+    CharacteristicPnpId: bytes.fromhex("02260401000101"),
+    CharacteristicSchedule: bytes.fromhex("775b0000b0040000110105"),
+    CharacteristicSMP: bytes.fromhex("1200000a3f0704") + b"0123456789",
+    CharacteristicStartStopWatering: b"0='10',1='3600'",
+    CharacteristicString: b"1.2.34",
+    CharacteristicTime: bytes.fromhex("a0b1c365"),
+    CharacteristicTimeArray: bytes.fromhex("a0b1c365b0b1c365c0b1c365"),
+    CharacteristicTimeDelta: (1200).to_bytes(4, "little"),
+    CharacteristicTimeOfDay: (23415).to_bytes(4, "little"),
+    CharacteristicUInt16: (1500).to_bytes(2, "little"),
+    CharacteristicUInt16Array: bytes.fromhex("dc05b004"),
+    CharacteristicUInt16PairArray: bytes.fromhex("3c00140078002800"),
+    CharacteristicWeekdays: b"\x11",
+}
+"""Representative payload for each characteristic codec."""
+
+PRODUCT_INFO: dict[ProductType, tuple[int, int, int]] = {
+    ProductType.MOWER: (10, 0, 0),
+    ProductType.WATER_COMPUTER: (18, 3, 0),
+    ProductType.VALVE: (18, 2, 1),
+    ProductType.AQUA_CONTOURS: (18, 16, 1),
+    ProductType.PUMP: (17, 1, 0),
+    ProductType.PRESSURE_TANKS: (17, 2, 0),
+    ProductType.AUTOMATS: (17, 3, 0),
+}
+"""Advertised group, model and variant of each product type."""
+
+
+def sample_for(char: Characteristic) -> bytes | None:
+    """Representative payload for the codec of a characteristic."""
+    for cls in type(char).__mro__:
+        if (sample := SAMPLES.get(cls)) is not None:
+            return sample
+    return None
+
+
+def _build_services(
+    product_type: ProductType, mtu: int
+) -> tuple[BleakGATTServiceCollection, dict[int, bytes]]:
+    """GATT tree of a product type, and the initial value of each handle.
+
+    UUIDs are normalized like bleak reports them. A UUID appears once per
+    service, but may appear in several services, so values are kept per
+    handle.
+    """
+    collection = BleakGATTServiceCollection()
+    values: dict[int, bytes] = {}
+    handle = 0
+    for service in Service.services_for_product_type(product_type):
+        handle += 1
+        gatt_service = BleakGATTService(None, handle, normalize_uuid_str(service.uuid))
+        collection.add_service(gatt_service)
+        chars: dict[str, Characteristic] = {}
+        for char in service.characteristics.values():
+            chars.setdefault(normalize_uuid_str(char.uuid), char)
+        for uuid, char in chars.items():
+            handle += 1
+            collection.add_characteristic(
+                BleakGATTCharacteristic(
+                    None,
+                    handle,
+                    uuid,
+                    ["read", "write", "write-without-response", "notify"],
+                    lambda: mtu - ATT_HEADER_SIZE,
+                    gatt_service,
+                )
+            )
+            values[handle] = sample_for(char) or b"\x00"
+    return collection, values
+
+
+@dataclass(frozen=True)
+class Faults:
+    """Faults a simulated device injects, as probabilities per event."""
+
+    connect_error: float = 0.0
+    """Connecting raises BleakError."""
+    disconnect: float = 0.0
+    """The link drops halfway through an operation."""
+    notification_drop: float = 0.0
+    """A notification is lost."""
+    discovery_delay: float = 0.0
+    """Seconds of service discovery added to every connect."""
+
+
+NO_FAULTS = Faults()
+
+
+class SimulatedDevice:
+    """A simulated peripheral of a product type.
+
+    Every operation of a connected client takes latency seconds, and
+    connecting takes connect_latency seconds. Writes without response and
+    notifications are limited to the MTU, like on a real link.
+
+    Faults are drawn from a random generator seeded with seed, or the
+    address, so runs are repeatable. Injected faults are counted by kind.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        product_type: ProductType,
+        *,
+        serial: int = 0,
+        latency: float = 0.0,
+        connect_latency: float = 0.0,
+        mtu: int = DEFAULT_MTU,
+        faults: Faults = NO_FAULTS,
+        seed: int | str | None = None,
+    ) -> None:
+        self.address = address
+        self.product_type = product_type
+        self.serial = serial
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.mtu = mtu
+        self.ble_device = BLEDevice(address=address, name="Gardena", details=self)
+        self.services, self.values = _build_services(product_type, mtu)
+
+        self.faults = faults
+        self.rng = random.Random(address if seed is None else seed)
+        self.injected = Counter[str]()
+
+        self.reads = 0
+        self.writes = 0
+        self.connects = 0
+        self.clients: set[SimulatedClient] = set()
+
+    def _inject(self, kind: str, probability: float) -> bool:
+        if probability and self.rng.random() < probability:
+            self.injected[kind] += 1
+            return True
+        return False
+
+    def manufacturer_data(self) -> bytes:
+        """Raw manufacturer data advertised by the device."""
+        group, model, variant = PRODUCT_INFO.get(self.product_type, (0, 0, 0))
+        return (
+            bytes((4, 6, group, model, variant))
+            + bytes((5, 4))
+            + self.serial.to_bytes(4, "little")
+            + bytes((2, 5, 0))
+        )
+
+    def advertisement(self, rssi: int = -60) -> tuple[BLEDevice, AdvertisementData]:
+        advertisement = AdvertisementData(
+            local_name="Gardena",
+            manufacturer_data={ManufacturerData.company: self.manufacturer_data()},
+            service_data={},
+            service_uuids=[],
+            tx_power=None,
+            rssi=rssi,
+            platform_data=(),
+        )
+        return self.ble_device, advertisement
+
+    def handles(self, uuid: str) -> list[int]:
+        """Handles of the characteristics with a UUID, in any service."""
+        uuid = normalize_uuid_str(uuid)
+        return [
+            char.handle
+            for char in self.services.characteristics.values()
+            if char.uuid == uuid
+        ]
+
+    def value(self, uuid: str) -> bytes:
+        """Value of the first characteristic with a UUID."""
+        return self.values[self.handles(uuid)[0]]
+
+    def set_value(self, uuid: str, data: bytes) -> None:
+        """Change a value on the device side, notifying subscribed clients.
+
+        Every characteristic with the UUID is changed.
+        """
+        for handle in self.handles(uuid):
+            self.values[handle] = bytes(data)
+            for client in list(self.clients):
+                client._notify(handle, data)
+
+    async def connect(self) -> "SimulatedClient":
+        if delay := self.connect_latency + self.faults.discovery_delay:
+            await asyncio.sleep(delay)
+        if self._inject("connect_error", self.faults.connect_error):
+            raise BleakError(f"Simulated connection failure to {self.address}")
+        self.connects += 1
+        client = SimulatedClient(self)
+        self.clients.add(client)
+        return client
+
+
+async def connect_simulated(device: BLEDevice) -> "SimulatedClient":
+    """Connector for CachedConnection, connecting to a simulated device."""
+    if not isinstance(simulated := device.details, SimulatedDevice):
+        raise BleakError(f"Device {device.address} is not simulated")
+    return await simulated.connect()
+
+
+class SimulatedClient:
+    """Connected client of a simulated device, behaving like a BleakClient."""
+
+    def __init__(self, device: SimulatedDevice) -> None:
+        self.device = device
+        self.address = device.address
+        self.services = device.services
+        self.is_connected = True
+        self._notify_callbacks: dict[
+            int, Callable[[BleakGATTCharacteristic, bytearray], Any]
+        ] = {}
+        self.on_disconnect: Callable[[], None] | None = None
+
+    @property
+    def mtu_size(self) -> int:
+        return self.device.mtu
+
+    def _characteristic(self, specifier) -> BleakGATTCharacteristic:
+        if isinstance(specifier, BleakGATTCharacteristic):
+            return specifier
+        if isinstance(specifier, str):
+            specifier = normalize_uuid_str(specifier)
+        if (char := self.services.get_characteristic(specifier)) is None:
+            raise BleakError(f"Characteristic {specifier} was not found!")
+        return char
+
+    async def _operation(self) -> None:
+        if not self.is_connected:
+            raise BleakError("Not connected")
+        device = self.device
+        if device.latency:
+            await asyncio.sleep(device.latency / 2)
+        if device._inject("disconnect", device.faults.disconnect):
+            await self.disconnect()
+        if device.latency:
+            await asyncio.sleep(device.latency / 2)
+        if not self.is_connected:
+            raise BleakError("Disconnected during operation")
+
+    async def read_gatt_char(self, specifier, **kwargs) -> bytearray:
+        char = self._characteristic(specifier)
+        await self._operation()
+        self.device.reads += 1
+        return bytearray(self.device.values[char.handle])
+
+    async def write_gatt_char(
+        self, specifier, data, response: bool | None = None
+    ) -> None:
+        char = self._characteristic(specifier)
+        if not response and len(data) > self.device.mtu - ATT_HEADER_SIZE:
+            raise BleakError(f"Write of {len(data)} bytes exceeds the MTU")
+        await self._operation()
+        self.device.writes += 1
+        self.device.values[char.handle] = bytes(data)
+
+    async def start_notify(self, specifier, callback, **kwargs) -> None:
+        char = self._characteristic(specifier)
+        await self._operation()
+        self._notify_callbacks[char.handle] = callback
+
+    async def stop_notify(self, specifier) -> None:
+        char = self._characteristic(specifier)
+        await self._operation()
+        self._notify_callbacks.pop(char.handle, None)
+
+    def _notify(self, handle: int, data: bytes) -> None:
+        if (callback := self._notify_callbacks.get(handle)) is None:
+            return
+        if self.device._inject(
+            "notification_drop", self.device.faults.notification_drop
+        ):
+            return
+        char = self.services.get_characteristic(handle)
+        payload = bytearray(data[: self.device.mtu - ATT_HEADER_SIZE])
+        if self.device.latency:
+            asyncio.get_running_loop().call_later(
+                self.device.latency, callback, char, payload
+            )
+        else:
+            callback(char, payload)
+
+    async def disconnect(self) -> bool:
+        if not self.is_connected:
+            return True
+        self.is_connected = False
+        self._notify_callbacks.clear()
+        self.device.clients.discard(self)
+        if self.on_disconnect is not None:
+            self.on_disconnect()
+        return True
@@ -0,0 +1,109 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from bleak import AdvertisementData
+from bleak.backends.device import BLEDevice
+
+from gardena_bluetooth.adapters import ConnectionRouter, RoutedConnection
+from gardena_bluetooth.client import DEFAULT_DELAY
+from gardena_bluetooth.parse import ManufacturerData
+from gardena_bluetooth.scan import ScannerHub, ScanOptions
+
+ADDRESS = "00:00:00:00:00:01"
+
+
+def _advertisement(adapter: str, rssi: int) -> tuple[BLEDevice, AdvertisementData]:
+    device = BLEDevice(address=ADDRESS, name="Gardena", details=adapter)
+    advertisement = AdvertisementData(
+        local_name="Gardena",
+        manufacturer_data={ManufacturerData.company: bytes.fromhex("0504f162c103")},
+        service_data={},
+        service_uuids=[],
+        tx_power=None,
+        rssi=rssi,
+        platform_data=(),
+    )
+    return device, advertisement
+
+
+async def _sighted(rssi: dict[str, int]) -> ScannerHub:
+    callbacks = {}
+
+    def _factory(*args, detection_callback, adapter, **kwargs):
+        callbacks[adapter] = detection_callback
+        scanner = MagicMock()
+        scanner.start = AsyncMock()
+        scanner.stop = AsyncMock()
+        return scanner
+
+    hub = ScannerHub.get(options=ScanOptions(adapters=tuple(rssi)))
+    with patch("gardena_bluetooth.scan.BleakScanner", new=_factory):
+        async with hub.consume() as queue:
+            for adapter, value in rssi.items():
+                callbacks[adapter](*_advertisement(adapter, value))
+            assert queue.qsize() == len(rssi)
+    return hub
+
+
+async def test_router_prefers_signal_and_free_slots():
+    hub = await _sighted({"hci0": -80, "hci1": -60, "hci2": -65})
+    assert len(hub.devices) == 1
+
+    router = ConnectionRouter(hub, slots=2, slot_penalty=10)
+    assert router.select(ADDRESS).adapter == "hci1"
+
+    router.acquire("hci1")
+    assert router.select(ADDRESS).adapter == "hci2"
+
+    router.acquire("hci1")
+    router.acquire("hci2")
+    router.acquire("hci2")
+    assert router.select(ADDRESS).adapter == "hci0"
+    assert router.select("00:00:00:00:00:02") is None
+
+
+async def test_routed_connection_claims_slot():
+    hub = await _sighted({"hci0": -80, "hci1": -60})
+    router = ConnectionRouter(hub)
+    fallback = BLEDevice(address=ADDRESS, name="Gardena", details=None)
+    connection = RoutedConnection(DEFAULT_DELAY, lambda: fallback, router)
+
+    bleak_client = MagicMock()
+    bleak_client.is_connected = True
+    bleak_client.disconnect = AsyncMock()
+    establish = AsyncMock(return_value=bleak_client)
+    with patch("gardena_bluetooth.client.establish_connection", establish):
+        async with connection():
+            assert router.connections == {"hci1": 1}
+        await connection.disconnect()
+
+    assert establish.await_args.args[1].details == "hci1"
+    assert not router.connections
+
+
+async def test_router_holds_hub():
+    hub = ScannerHub.get()
+    with ConnectionRouter(hub) as router:
+        assert router.hub is hub
+        assert ScannerHub.get() is hub
+    assert ScannerHub.get() is not hub
+
+
+async def test_sighting_keeps_strongest_in_window():
+    callbacks = []
+
+    def _factory(*args, detection_callback, **kwargs):
+        callbacks.append(detection_callback)
+        scanner = MagicMock()
+        scanner.start = AsyncMock()
+        scanner.stop = AsyncMock()
+        return scanner
+
+    hub = ScannerHub(options=ScanOptions(adapters=("hci0",)), sighting_window=10.0)
+    with patch("gardena_bluetooth.scan.BleakScanner", new=_factory):
+        async with hub.consume():
+            with patch("time.monotonic", side_effect=[0.0, 5.0, 20.0]):
+                callbacks[0](*_advertisement("hci0", -50))
+                callbacks[0](*_advertisement("hci0", -90))
+                assert hub.sightings.get(ADDRESS)["hci0"].rssi == -50
+                callbacks[0](*_advertisement("hci0", -90))
+            assert hub.sightings.get(ADDRESS)["hci0"].rssi == -90
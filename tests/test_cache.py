@@ -0,0 +1,38 @@
+from gardena_bluetooth.cache import ManufacturerDataCache
+from gardena_bluetooth.parse import (
+    ManufacturerData,
+    ProductGroup,
+    ProductModelWaterControl,
+)
+
+PRODUCT_TYPE_MANUFACTURER_DATA = bytes.fromhex("0205000406121001")
+
+
+def test_cache_roundtrip(tmp_path):
+    path = tmp_path / "cache.json"
+    manufacturer_data = ManufacturerData.decode(PRODUCT_TYPE_MANUFACTURER_DATA)
+
+    cache = ManufacturerDataCache(path)
+    cache.update("00:00:00:00:00:01", manufacturer_data, now=100.0)
+    cache.save()
+
+    loaded = ManufacturerDataCache(path)
+    loaded.load()
+    result = loaded.get("00:00:00:00:00:01", now=100.0)
+    assert result == manufacturer_data
+    assert isinstance(result.group, ProductGroup)
+    assert isinstance(result.model, ProductModelWaterControl)
+    assert loaded.age("00:00:00:00:00:01", now=160.0) == 60.0
+
+
+def test_cache_ignores_stale_and_broken(tmp_path):
+    path = tmp_path / "cache.json"
+    cache = ManufacturerDataCache(path, max_age=10.0)
+    cache.update("00:00:00:00:00:01", ManufacturerData(serial=1), now=0.0)
+    assert cache.get("00:00:00:00:00:01", now=5.0) == ManufacturerData(serial=1)
+    assert cache.get("00:00:00:00:00:01", now=11.0) is None
+
+    cache.load()
+    path.write_text("{not json")
+    cache.load()
+    assert "00:00:00:00:00:01" in cache
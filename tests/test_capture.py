@@ -0,0 +1,81 @@
+import asyncio
+
+from bleak import AdvertisementData
+from bleak.backends.device import BLEDevice
+
+from gardena_bluetooth.capture import CaptureWriter, read_capture, replay_backend
+from gardena_bluetooth.const import ScanService
+from gardena_bluetooth.parse import ManufacturerData
+from gardena_bluetooth.scan import (
+    DEFAULT_QUEUE_SIZE,
+    DeviceProgress,
+    advertisement_queue,
+)
+
+
+def _advertisement(address: str, payload: str) -> tuple[BLEDevice, AdvertisementData]:
+    device = BLEDevice(address=address, name="Gardena", details=None)
+    advertisement = AdvertisementData(
+        local_name="Gardena",
+        manufacturer_data={ManufacturerData.company: bytes.fromhex(payload)},
+        service_data={ScanService: b"\x01"},
+        service_uuids=[ScanService],
+        tx_power=None,
+        rssi=-70,
+        platform_data=(),
+    )
+    return device, advertisement
+
+
+def _write(path):
+    with CaptureWriter(path) as writer:
+        writer.write(*_advertisement("00:00:00:00:00:01", "0205000406121001"), 0.0)
+        writer.write(*_advertisement("00:00:00:00:00:02", "0504f162c103"), 0.01)
+        writer.write(*_advertisement("00:00:00:00:00:02", "0205000406121001"), 0.02)
+
+
+def test_capture_roundtrip(tmp_path):
+    path = tmp_path / "capture.jsonl.gz"
+    _write(path)
+
+    records = list(read_capture(path))
+    assert [offset for offset, _, _ in records] == [0.0, 0.01, 0.02]
+    _, device, advertisement = records[0]
+    assert device.address == "00:00:00:00:00:01"
+    assert advertisement == _advertisement("00:00:00:00:00:01", "0205000406121001")[1]
+
+
+async def test_replay_backend(tmp_path):
+    path = tmp_path / "capture.jsonl"
+    _write(path)
+
+    backend = replay_backend(path, realtime=True, speed=2.0)
+    addresses = {"00:00:00:00:00:01", "00:00:00:00:00:02"}
+    async with DeviceProgress(addresses, backend=backend, timeout=1.0) as progress:
+        results = [result async for result in progress]
+
+    assert [result.ble_device.address for result in results] == [
+        "00:00:00:00:00:01",
+        "00:00:00:00:00:02",
+    ]
+    assert results[1].manufacturer_data.serial == 63005425
+
+
+async def test_replay_as_fast_as_possible_drops_nothing(tmp_path):
+    path = tmp_path / "capture.jsonl"
+    count = 4 * DEFAULT_QUEUE_SIZE
+    with CaptureWriter(path) as writer:
+        for index in range(count):
+            address = f"00:00:00:00:{index >> 8:02X}:{index & 0xFF:02X}"
+            writer.write(*_advertisement(address, "0205000406121001"), 0.0)
+
+    backend = replay_backend(path, realtime=False)
+    addresses = []
+    async with advertisement_queue(backend) as queue:
+        async with asyncio.timeout(5):
+            while len(addresses) < count:
+                device, _ = await queue.get()
+                addresses.append(device.address)
+        assert queue.dropped == 0
+
+    assert len(set(addresses)) == count
@@ -1,11 +1,26 @@
-from unittest.mock import patch
+from calendar import Day
+from datetime import time, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from bleak.backends.device import BLEDevice
 from bleak.exc import BleakError
 
 from gardena_bluetooth.client import DEFAULT_DELAY, CachedConnection, Client
+from gardena_bluetooth.const import (
+    SCHEDULES,
+    AquaContourSchedule,
+    Pump,
+    ScheduleData,
+    Valve,
+)
 from gardena_bluetooth.exceptions import CommunicationFailure
+from gardena_bluetooth.parse import (
+    CharacteristicSchedule,
+    CharacteristicScheduleData,
+    Contour,
+    ProductType,
+)
 
 
 @pytest.mark.asyncio
@@ -30,3 +45,219 @@ async def test_establish_connection_failure_raises_communication_failure():
             await client.read_char_raw("00000000-0000-0000-0000-000000000000")
 
     assert cached_connection._client is None
+
+
+async def test_subscribe_char_dispatches_by_handle():
+    device = BLEDevice(address="AA:BB:CC:DD:EE:FF", name="Gardena", details=None)
+    gatt_char = MagicMock(handle=17, uuid=Valve.state.uuid)
+
+    bleak_client = MagicMock()
+    bleak_client.is_connected = True
+    bleak_client.services.get_characteristic.return_value = gatt_char
+    bleak_client.start_notify = AsyncMock()
+    bleak_client.stop_notify = AsyncMock()
+    bleak_client.disconnect = AsyncMock()
+
+    client = Client(CachedConnection(DEFAULT_DELAY, lambda: device))
+    first: list[bool] = []
+    second: list[bool] = []
+
+    with patch(
+        "gardena_bluetooth.client.establish_connection",
+        AsyncMock(return_value=bleak_client),
+    ):
+        cleanup_first = await client.subscribe_char(Valve.state, first.append)
+        cleanup_second = await client.subscribe_char(Valve.state, second.append)
+        bleak_client.start_notify.assert_awaited_once()
+        dispatcher = bleak_client.start_notify.await_args.args[1]
+
+        dispatcher(gatt_char, bytearray(b"\x01"))
+        dispatcher(MagicMock(handle=18), bytearray(b"\x00"))
+        assert first == [True]
+        assert second == [True]
+
+        await cleanup_first()
+        bleak_client.stop_notify.assert_not_awaited()
+        dispatcher(gatt_char, bytearray(b"\x00"))
+        assert first == [True]
+        assert second == [True, False]
+
+        await cleanup_second()
+        bleak_client.stop_notify.assert_awaited_once_with(gatt_char)
+        await client.disconnect()
+
+
+class _FakeBleakClient:
+    """Minimal stand in for a connected BleakClient backed by a dict."""
+
+    def __init__(self, values: dict[str, bytes]) -> None:
+        self.values = values
+        self.reads: list[str] = []
+        self.writes: list[tuple[str, bytes]] = []
+        self.is_connected = True
+        self.address = "AA:BB:CC:DD:EE:FF"
+        self.services = MagicMock()
+        self.services.get_characteristic.side_effect = self._get_characteristic
+
+    def _get_characteristic(self, uuid: str):
+        if uuid not in self.values:
+            return None
+        return MagicMock(uuid=uuid, properties=["read", "write"])
+
+    async def read_gatt_char(self, characteristic) -> bytearray:
+        self.reads.append(characteristic.uuid)
+        return bytearray(self.values[characteristic.uuid])
+
+    async def write_gatt_char(self, characteristic, data: bytes, response: bool):
+        self.writes.append((characteristic.uuid, bytes(data)))
+        self.values[characteristic.uuid] = bytes(data)
+
+    async def disconnect(self):
+        self.is_connected = False
+
+
+def _schedule(hour: int) -> CharacteristicScheduleData:
+    return CharacteristicScheduleData(
+        start_time=time(hour, 0),
+        duration=timedelta(minutes=10),
+        weekdays={Day.MONDAY},
+        active=True,
+        contours={Contour.CONTOUR_1},
+    )
+
+
+async def test_sync_schedules_writes_only_changed_slots():
+    device = BLEDevice(address="AA:BB:CC:DD:EE:FF", name="Gardena", details=None)
+    slots = AquaContourSchedule.schedules
+    bleak_client = _FakeBleakClient(
+        {
+            char.uuid: CharacteristicSchedule.encode(_schedule(index))
+            for index, char in enumerate(slots)
+        }
+    )
+    client = Client(
+        CachedConnection(DEFAULT_DELAY, lambda: device), ProductType.AQUA_CONTOURS
+    )
+
+    desired = [_schedule(index) for index in range(len(slots))]
+    desired[2] = _schedule(20)
+    desired[5] = None
+    desired[7] = _schedule(21)
+
+    with patch(
+        "gardena_bluetooth.client.establish_connection",
+        AsyncMock(return_value=bleak_client),
+    ) as establish:
+        written = await client.sync_schedules(desired)
+        await client.disconnect()
+
+    establish.assert_awaited_once()
+    assert written == [slots[2], slots[7]]
+    assert len(bleak_client.reads) == len(slots) - 1
+    assert bleak_client.writes == [
+        (slots[2].uuid, CharacteristicSchedule.encode(_schedule(20))),
+        (slots[7].uuid, CharacteristicSchedule.encode(_schedule(21))),
+    ]
+
+
+async def test_read_and_write_legacy_schedules():
+    device = BLEDevice(address="AA:BB:CC:DD:EE:FF", name="Gardena", details=None)
+    values: dict[str, bytes] = {}
+    for index, service in enumerate(SCHEDULES[:3]):
+        values[service.start_time.uuid] = (3600 * (index + 6)).to_bytes(4, "little")
+        values[service.duration.uuid] = (600).to_bytes(4, "little")
+        values[service.weekdays.uuid] = b"\x7f"
+        values[service.valve_link.uuid] = b"\x01"
+        values[service.active.uuid] = b"\x01"
+        values[service.sensor_link.uuid] = b"\x00"
+    bleak_client = _FakeBleakClient(values)
+    client = Client(
+        CachedConnection(DEFAULT_DELAY, lambda: device), ProductType.WATER_COMPUTER
+    )
+
+    with patch(
+        "gardena_bluetooth.client.establish_connection",
+        AsyncMock(return_value=bleak_client),
+    ) as establish:
+        schedules = await client.read_schedules()
+        assert schedules[3:] == [None, None]
+        assert schedules[1] == ScheduleData(
+            start_time=time(7, 0),
+            duration=timedelta(minutes=10),
+            weekdays=set(Day),
+            valve_link=b"\x01",
+            active=True,
+            sensor_link=False,
+        )
+
+        schedules[1].active = False
+        written = await client.write_schedules(schedules[:3])
+        await client.disconnect()
+
+    establish.assert_awaited_once()
+    assert written == [SCHEDULES[1].active]
+    assert bleak_client.writes == [(SCHEDULES[1].active.uuid, b"\x00")]
+
+
+async def test_reconcile_writes_only_differences():
+    device = BLEDevice(address="AA:BB:CC:DD:EE:FF", name="Gardena", details=None)
+    bleak_client = _FakeBleakClient(
+        {
+            Pump.leakage_detection.uuid: b"\x01",
+            Pump.child_lock.uuid: b"\x00",
+            Pump.max_runtime.uuid: b"\x1e",
+            Pump.min_preassure.uuid: (1500).to_bytes(2, "little"),
+        }
+    )
+    client = Client(CachedConnection(DEFAULT_DELAY, lambda: device), ProductType.PUMP)
+
+    with patch(
+        "gardena_bluetooth.client.establish_connection",
+        AsyncMock(return_value=bleak_client),
+    ):
+        changed = await client.reconcile(
+            Pump, {"leakage_detection": True, "child_lock": True, "max_runtime": 30}
+        )
+        with pytest.raises(ValueError):
+            await client.reconcile(Pump, {"rain_pause": 0})
+        await client.disconnect()
+
+    assert changed == ["child_lock"]
+    assert bleak_client.values[Pump.child_lock.uuid] == b"\x01"
+    assert bleak_client.writes == [(Pump.child_lock.uuid, b"\x01")]
+    assert bleak_client.reads.count(Pump.child_lock.uuid) == 1
+    assert Pump.min_preassure.uuid not in bleak_client.reads
+
+
+async def test_sync_schedules_deactivates_trailing_slots():
+    device = BLEDevice(address="AA:BB:CC:DD:EE:FF", name="Gardena", details=None)
+    slots = AquaContourSchedule.schedules
+    inactive = _schedule(3)
+    inactive.active = False
+    values = {
+        char.uuid: CharacteristicSchedule.encode(_schedule(index))
+        for index, char in enumerate(slots)
+    }
+    values[slots[3].uuid] = CharacteristicSchedule.encode(inactive)
+    bleak_client = _FakeBleakClient(values)
+    client = Client(
+        CachedConnection(DEFAULT_DELAY, lambda: device), ProductType.AQUA_CONTOURS
+    )
+
+    desired = [_schedule(0), _schedule(1), None]
+    with patch(
+        "gardena_bluetooth.client.establish_connection",
+        AsyncMock(return_value=bleak_client),
+    ):
+        written = await client.sync_schedules(desired)
+        await client.disconnect()
+
+    assert written == list(slots[4:])
+    assert sorted(bleak_client.reads) == sorted(
+        char.uuid for char in slots[:2] + slots[3:]
+    )
+    for index, char in enumerate(slots):
+        schedule = CharacteristicSchedule.decode(bleak_client.values[char.uuid])
+        assert schedule.active == (index < 3)
+        if index != 3:
+            assert schedule.start_time == time(index, 0)
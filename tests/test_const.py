@@ -64,3 +64,30 @@ def test_standard_battery_service_covers_water_control_family(
     """Battery service resolves for all supported product types."""
     assert product_type in StandardBattery.products
     assert StandardBattery in Service.services_for_product_type(product_type)
+
+
+@pytest.mark.parametrize("product_type", list(ProductType))
+def test_service_catalog(product_type: ProductType) -> None:
+    """Catalog is shared and matches a walk of the registry."""
+    catalog = Service.catalog(product_type)
+    assert Service.catalog(product_type) is catalog
+
+    services = [
+        service
+        for services in Service.registry.values()
+        for service in services
+        if product_type in service.products
+    ]
+    assert list(catalog.services) == services
+
+    for uuid, candidates in Service.registry.items():
+        expected = next(
+            (service for service in candidates if product_type in service.products),
+            None,
+        )
+        assert Service.find_service(uuid, product_type) is expected
+
+    for service in services:
+        for char in service.characteristics.values():
+            assert char.unique_id in catalog.unique_ids
+            assert char in catalog.characteristics_by_uuid[char.uuid]
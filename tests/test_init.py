@@ -0,0 +1,31 @@
+import subprocess
+import sys
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    "module",
+    ["gardena_bluetooth", "gardena_bluetooth.parse", "gardena_bluetooth.const"],
+)
+def test_import_does_not_require_bleak(module: str):
+    """Codecs can be imported without pulling in bleak."""
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys, {module}; assert 'bleak' not in sys.modules",
+        ],
+        check=True,
+    )
+
+
+def test_register_uuid_names():
+    from bleak.uuids import uuidstr_to_str
+
+    from gardena_bluetooth import register_uuid_names
+    from gardena_bluetooth.const import ScanService, Valve
+
+    register_uuid_names()
+    assert uuidstr_to_str(Valve.uuid) == "Gardena Valve"
+    assert uuidstr_to_str(ScanService) == "Husqvarna"
@@ -0,0 +1,127 @@
+import math
+
+from gardena_bluetooth.client import DEFAULT_DELAY, CachedConnection, Client
+from gardena_bluetooth.const import Valve
+from gardena_bluetooth.loadtest import (
+    LatencyStats,
+    SimulatedGateway,
+    Workload,
+    run_bench,
+    run_fleet,
+    simulated_fleet,
+)
+from gardena_bluetooth.parse import ProductType
+from gardena_bluetooth.simulator import (
+    Faults,
+    SimulatedDevice,
+    connect_simulated,
+    sample_for,
+)
+
+
+def test_latency_stats_percentiles():
+    stats = LatencyStats()
+    assert math.isnan(stats.percentile(50))
+    for value in range(1, 101):
+        stats.add(value / 1000)
+    assert stats.percentile(50) == 0.05
+    assert stats.percentile(99) == 0.099
+    assert stats.summary()["max"] == 0.1
+
+
+async def test_run_fleet_reports_operations():
+    devices = simulated_fleet(8, latency=0.001)
+    report = await run_fleet(
+        devices, Workload(duration=0.3, interval=0.02, max_connections=4)
+    )
+    assert report.devices == 8
+    assert report.operations > 0
+    assert report.errors == 0
+    assert sum(len(stats) for stats in report.latency.values()) == report.operations
+    assert all(not device.clients for device in devices)
+
+
+async def test_gateway_limits_connections():
+    gateway = SimulatedGateway(max_connections=1)
+    first, second = simulated_fleet(2)
+    client = await gateway(first.ble_device)
+    assert gateway._slots.locked()
+    await client.disconnect()
+    await gateway(second.ble_device)
+    assert gateway.connects == {first.address: 1, second.address: 1}
+
+
+async def test_run_fleet_recovers_from_faults():
+    devices = simulated_fleet(
+        8,
+        latency=0.001,
+        faults=Faults(connect_error=0.2, disconnect=0.1, notification_drop=0.2),
+    )
+    report = await run_fleet(
+        devices,
+        Workload(duration=0.5, interval=0.01, notify_timeout=0.02, disconnect_delay=1),
+    )
+    assert report.errors > 0
+    assert report.operations > 0
+    assert sum(report.faults.values()) >= report.errors
+    assert len(report.recovery) > 0
+    assert "recovery" in report.format()
+
+
+def _bench_client(device: SimulatedDevice) -> tuple[CachedConnection, Client]:
+    connection = CachedConnection(
+        DEFAULT_DELAY, lambda: device.ble_device, connector=connect_simulated
+    )
+    return connection, Client(connection, device.product_type)
+
+
+async def test_run_bench_measures_cycles():
+    device = SimulatedDevice("00:00:00:00:00:01", ProductType.VALVE)
+    connection, client = _bench_client(device)
+
+    report = await run_bench(
+        connection,
+        client,
+        device.product_type,
+        cycles=3,
+        write=True,
+        trigger=lambda char: device.set_value(char.uuid, sample_for(char)),
+    )
+    assert report.errors == 0
+    assert report.connects == 3
+    assert report.reconnects == 0
+    assert len(report.latency["connect"]) == 3
+    assert len(report.latency["read"]) == 9
+    assert len(report.latency["notify"]) == 3
+    assert len(report.latency["write"]) == 3
+    assert not device.clients
+
+
+async def test_run_bench_counts_reconnects_after_drops():
+    device = SimulatedDevice(
+        "00:00:00:00:00:01", ProductType.PUMP, faults=Faults(disconnect=0.2)
+    )
+    connection, client = _bench_client(device)
+
+    report = await run_bench(
+        connection, client, device.product_type, cycles=10, reconnect=False
+    )
+    assert report.expected_connects == 1
+    assert report.errors == device.injected["disconnect"]
+    assert report.reconnects > 0
+    assert "reconnects" in report.format()
+
+
+async def test_run_bench_counts_decode_errors_and_skips_countdowns():
+    device = SimulatedDevice("00:00:00:00:00:01", ProductType.VALVE)
+    device.set_value(Valve.state.uuid, b"")
+    connection, client = _bench_client(device)
+
+    report = await run_bench(
+        connection, client, device.product_type, cycles=2, write=True
+    )
+    assert report.errors == 2
+    assert device.value(Valve.remaining_open_time.uuid) == sample_for(
+        Valve.remaining_open_time
+    )
+    assert len(report.latency["write"]) == 2
@@ -1,8 +1,10 @@
-from datetime import datetime, timedelta
+from calendar import Day
+from datetime import datetime, time, timedelta
 from enum import IntEnum
 
 import pytest
 
+from gardena_bluetooth import parse
 from gardena_bluetooth.parse import (
     BatteryChargeLevel,
     BatteryChargeState,
@@ -12,17 +14,24 @@ from gardena_bluetooth.parse import (
     CharacteristicBatteryLevelStatus,
     CharacteristicBatteryLevelStatusData,
     CharacteristicErrorData,
+    CharacteristicEventHistoryData,
     CharacteristicIntEnum,
     CharacteristicIntKeys,
     CharacteristicNullString,
     CharacteristicNullStringUf8,
+    CharacteristicSchedule,
+    CharacteristicScheduleData,
+    CharacteristicSMP,
     CharacteristicSMPData,
     CharacteristicStartStopWatering,
     CharacteristicString,
+    Contour,
     ManufacturerData,
     PowerSourceConnected,
     ProductGroup,
+    ProductModelWaterControl,
     ProductType,
+    SkipReason,
     WateringSource,
 )
 
@@ -249,3 +258,101 @@ def test_watering_stop():
     assert raw == b"0='10'"
     data = char.decode(raw)
     assert data == value
+
+
+def test_manufacturer_data_update_memoized():
+    raw = bytes.fromhex("0205000406121001")
+    parse._decode_manufacturer_fields.cache_clear()
+    first = ManufacturerData.decode(raw)
+    second = ManufacturerData.decode(bytearray(raw))
+    assert first == second
+    info = parse._decode_manufacturer_fields.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+    assert first.model is ProductModelWaterControl.AQUA_CONTOURS
+
+    second.update(bytes.fromhex("0504f162c103"))
+    assert second.serial == 63005425
+    assert first.serial is None
+
+
+def test_schedule_encode_decode():
+    value = CharacteristicScheduleData(
+        start_time=time(6, 30, 15),
+        duration=timedelta(minutes=20),
+        weekdays={Day.MONDAY, Day.FRIDAY},
+        active=True,
+        contours={Contour.CONTOUR_1, Contour.CONTOUR_3},
+    )
+    raw = CharacteristicSchedule.encode(value)
+    assert raw == b"\x77\x5b\x00\x00\xb0\x04\x00\x00\x11\x01\x05"
+    assert CharacteristicSchedule.decode(raw) == value
+
+
+def test_event_history_encode_decode():
+    raw = bytes.fromhex("0105a0b1c3650203102e0000")
+    value = CharacteristicEventHistoryData.decode(raw)
+    assert value.skip_reason is SkipReason.RAIN_SENSOR
+    assert value.duration == timedelta(seconds=11792)
+    assert CharacteristicEventHistoryData.encode(value) == raw
+
+
+def test_encode_into_preallocated_buffer():
+    schedule = CharacteristicScheduleData(
+        start_time=time(22, 0),
+        duration=timedelta(hours=1),
+        weekdays=set(Day),
+        active=False,
+        contours=set(),
+    )
+    smp = CharacteristicSMPData(
+        res=0,
+        ver=1,
+        op=2,
+        flags=0,
+        group=63,
+        sequence_num=7,
+        command_id=4,
+        payload=b"hello",
+    )
+
+    buffer = bytearray(2 + CharacteristicSchedule.encoded_size(schedule) + 12)
+    view = memoryview(buffer)
+    offset = CharacteristicSchedule.encode_into(view, 2, schedule)
+    offset = CharacteristicSMP.encode_into(view, offset, smp)
+    assert offset == len(buffer)
+    assert buffer[2:offset] == (
+        CharacteristicSchedule.encode(schedule) + CharacteristicSMPData.encode(smp)
+    )
+
+
+def test_encode_out_of_range_raises_overflow():
+    schedule = CharacteristicScheduleData(
+        start_time=time(22, 0),
+        duration=timedelta(seconds=2**31),
+        weekdays=set(),
+        active=True,
+        contours=set(),
+    )
+    with pytest.raises(OverflowError):
+        CharacteristicSchedule.encode(schedule)
+
+    smp = CharacteristicSMPData(
+        res=0,
+        ver=1,
+        op=2,
+        flags=0,
+        group=63,
+        sequence_num=256,
+        command_id=4,
+        payload=b"",
+    )
+    with pytest.raises(OverflowError):
+        CharacteristicSMP.encode(smp)
+
+
+def test_encode_into_default_uses_encode():
+    char = CharacteristicStartStopWatering("")
+    value = (WateringSource.MOBILE_APP, None)
+    buffer = bytearray(8)
+    assert char.encode_into(buffer, 1, value) == 1 + char.encoded_size(value)
+    assert buffer == b"\x000='10'\x00"
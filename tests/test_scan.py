@@ -1,14 +1,31 @@
 import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import pytest
 from bleak import AdvertisementData
 from bleak.backends.device import BLEDevice
 
+from gardena_bluetooth import scan
+from gardena_bluetooth.cache import ManufacturerDataCache
 from gardena_bluetooth.const import ScanService
-from gardena_bluetooth.parse import ManufacturerData
-from gardena_bluetooth.scan import async_scan_devices
+from gardena_bluetooth.parse import ManufacturerData, ProductType
+from gardena_bluetooth.scan import (
+    SCAN_PASSIVE,
+    AdvertisementQueue,
+    DeviceProgress,
+    DeviceTable,
+    QueueOverflow,
+    ScannerHub,
+    ScanOptions,
+    ScanResult,
+    ScanScheduler,
+    async_get_devices,
+    async_get_manufacturer_data,
+    async_scan_devices,
+)
 
 WATER_CONTROL_MANUFACTURER_DATA = bytes.fromhex("8e60c20b3401001d04")
+PRODUCT_TYPE_MANUFACTURER_DATA = bytes.fromhex("0205000406121001")
 
 
 def _advertisement(
@@ -16,6 +33,7 @@ def _advertisement(
     *,
     service_uuids: list[str] | None = None,
     manufacturer_data: dict[int, bytes] | None = None,
+    rssi: int = -60,
 ) -> tuple[BLEDevice, AdvertisementData]:
     device = BLEDevice(address=address, name="Gardena", details=None)
     advertisement = AdvertisementData(
@@ -24,7 +42,7 @@ def _advertisement(
         service_data={},
         service_uuids=service_uuids or [],
         tx_power=None,
-        rssi=-60,
+        rssi=rssi,
         platform_data=(),
     )
     return device, advertisement
@@ -58,6 +76,20 @@ async def _first_address() -> str | None:
     return None
 
 
+async def _collect(**kwargs) -> list[ScanResult]:
+    results = []
+    generator = async_scan_devices(**kwargs)
+    try:
+        async with asyncio.timeout(0.1):
+            async for result in generator:
+                results.append(result)
+    except TimeoutError:
+        pass
+    finally:
+        await generator.aclose()
+    return results
+
+
 async def test_scan_accepts_manufacturer_data_advertisement():
     advertisements = [
         _advertisement(
@@ -79,3 +111,427 @@ async def test_scan_skips_advertisement_without_manufacturer_data():
         "gardena_bluetooth.scan.BleakScanner", new=_mock_scanner(advertisements)
     ):
         assert await _first_address() is None
+
+
+def test_device_table_evicts_least_recently_seen():
+    table = DeviceTable(ManufacturerData, max_size=2, idle_timeout=None)
+    first = table.seen("00:00:00:00:00:01", 0.0)
+    table.seen("00:00:00:00:00:02", 1.0)
+    assert table.seen("00:00:00:00:00:01", 2.0) is first
+
+    table.seen("00:00:00:00:00:03", 3.0)
+    assert len(table) == 2
+    assert "00:00:00:00:00:01" in table
+    assert "00:00:00:00:00:02" not in table
+
+
+def test_device_table_expires_idle_devices():
+    table = DeviceTable(ManufacturerData, max_size=10, idle_timeout=5.0)
+    table.seen("00:00:00:00:00:01", 0.0)
+    table.seen("00:00:00:00:00:02", 3.0)
+    table.seen("00:00:00:00:00:03", 6.0)
+    assert "00:00:00:00:00:01" not in table
+    assert table.get("00:00:00:00:00:02") is not None
+
+    table.expire(20.0)
+    assert len(table) == 0
+
+
+async def test_scan_only_changes():
+    def _data(payload: str, rssi: int = -60):
+        return _advertisement(
+            "00:00:00:00:00:01",
+            manufacturer_data={ManufacturerData.company: bytes.fromhex(payload)},
+            rssi=rssi,
+        )
+
+    advertisements = [
+        _data("0205000406121001"),
+        _data("0205000406121001"),
+        _data("0205000406121001", rssi=-62),
+        _data("0504f162c103"),
+        _data("0205000406121001"),
+        _data("0205000406121001", rssi=-75),
+    ]
+    with patch(
+        "gardena_bluetooth.scan.BleakScanner", new=_mock_scanner(advertisements)
+    ):
+        assert len(await _collect()) == 6
+        results = await _collect(only_changes=True, rssi_delta=10)
+
+    assert [result.advertisement.rssi for result in results] == [-60, -60, -75]
+    assert results[1].manufacturer_data.serial == 63005425
+
+
+async def test_queue_drop_oldest():
+    queue = AdvertisementQueue(maxsize=2, overflow=QueueOverflow.DROP_OLDEST)
+    for address in ("00:00:00:00:00:01", "00:00:00:00:00:02", "00:00:00:00:00:03"):
+        queue.put_nowait(_advertisement(address))
+
+    assert queue.qsize() == 2
+    assert queue.dropped == 1
+    assert (await queue.get())[0].address == "00:00:00:00:00:02"
+    assert (await queue.get())[0].address == "00:00:00:00:00:03"
+    assert queue.empty()
+
+
+async def test_queue_coalesce_per_address():
+    queue = AdvertisementQueue(maxsize=2, overflow=QueueOverflow.COALESCE)
+    queue.put_nowait(_advertisement("00:00:00:00:00:01", rssi=-70))
+    queue.put_nowait(_advertisement("00:00:00:00:00:02"))
+    queue.put_nowait(_advertisement("00:00:00:00:00:01", rssi=-50))
+    queue.put_nowait(_advertisement("00:00:00:00:00:03"))
+
+    assert queue.coalesced == 1
+    assert queue.dropped == 1
+    device, advertisement = await queue.get()
+    assert device.address == "00:00:00:00:00:02"
+    device, advertisement = await queue.get()
+    assert device.address == "00:00:00:00:00:03"
+
+    queue.put_nowait(_advertisement("00:00:00:00:00:01", rssi=-50))
+    queue.put_nowait(_advertisement("00:00:00:00:00:01", rssi=-40))
+    device, advertisement = await queue.get()
+    assert advertisement.rssi == -40
+
+
+async def test_queue_get_waits_for_item():
+    queue = AdvertisementQueue()
+    task = asyncio.create_task(queue.get())
+    await asyncio.sleep(0)
+    assert not task.done()
+    queue.put_nowait(_advertisement("00:00:00:00:00:01"))
+    assert (await task)[0].address == "00:00:00:00:00:01"
+
+
+async def test_hub_shares_scanner_between_consumers():
+    callbacks = []
+
+    def _factory(*args, detection_callback, **kwargs):
+        callbacks.append(detection_callback)
+        scanner = MagicMock()
+        scanner.start = AsyncMock()
+        scanner.stop = AsyncMock()
+        return scanner
+
+    def _data(address: str):
+        return _advertisement(
+            address,
+            manufacturer_data={
+                ManufacturerData.company: WATER_CONTROL_MANUFACTURER_DATA
+            },
+        )
+
+    hub = ScannerHub.get()
+    with patch("gardena_bluetooth.scan.BleakScanner", new=_factory):
+        async with (
+            hub.consume({"00:00:00:00:00:01"}) as first,
+            hub.consume() as second,
+        ):
+            assert hub.running
+            assert len(callbacks) == 1
+            callbacks[0](*_data("00:00:00:00:00:01"))
+            callbacks[0](*_data("00:00:00:00:00:02"))
+            callbacks[0](*_advertisement("00:00:00:00:00:03"))
+
+            assert first.qsize() == 1
+            assert second.qsize() == 2
+            result = await first.get()
+            assert result is await second.get()
+            assert result.manufacturer_data is hub.devices.get("00:00:00:00:00:01")
+
+        assert not hub.running
+        assert hub.consumers == 0
+    assert ScannerHub.get() is not hub
+
+
+async def test_hub_table_bounded_by_consumers():
+    hub = ScannerHub.get()
+    with patch("gardena_bluetooth.scan.BleakScanner", new=_mock_scanner([])):
+        async with hub.consume(max_devices=10, idle_timeout=5.0):
+            assert hub.devices.max_size == 10
+            async with hub.consume(max_devices=20, idle_timeout=None):
+                assert hub.devices.max_size == 20
+                assert hub.devices.idle_timeout is None
+            assert hub.devices.max_size == 10
+            assert hub.devices.idle_timeout == 5.0
+            assert ScannerHub.get() is hub
+
+
+async def test_get_manufacturer_data_from_cache():
+    address = "00:00:00:00:00:01"
+    cache = ManufacturerDataCache()
+    cache.update(address, ManufacturerData.decode(PRODUCT_TYPE_MANUFACTURER_DATA))
+
+    advertisements = [
+        _advertisement(
+            address,
+            manufacturer_data={ManufacturerData.company: bytes.fromhex("0504f162c103")},
+        )
+    ]
+    with patch(
+        "gardena_bluetooth.scan.BleakScanner", new=_mock_scanner(advertisements)
+    ):
+        result = await async_get_manufacturer_data({address}, cache=cache)
+        assert result[address].product_type == ProductType.AQUA_CONTOURS
+        await asyncio.gather(*scan._background_tasks)
+
+    assert cache.get(address).serial == 63005425
+
+
+async def test_get_devices_completes_from_cache():
+    address = "00:00:00:00:00:01"
+    cache = ManufacturerDataCache()
+    cache.update(address, ManufacturerData.decode(PRODUCT_TYPE_MANUFACTURER_DATA))
+
+    advertisements = [
+        _advertisement(
+            address,
+            manufacturer_data={ManufacturerData.company: bytes.fromhex("0504f162c103")},
+        )
+    ]
+    with patch(
+        "gardena_bluetooth.scan.BleakScanner", new=_mock_scanner(advertisements)
+    ):
+        devices = await async_get_devices({address}, cache=cache, timeout=1.0)
+
+    assert devices[address].manufacturer_data.group == 18
+    assert devices[address].manufacturer_data.serial == 63005425
+
+
+async def test_device_progress_yields_complete_devices():
+    advertisements = [
+        _advertisement(
+            "00:00:00:00:00:02",
+            manufacturer_data={ManufacturerData.company: bytes.fromhex("0504f162c103")},
+        ),
+        _advertisement(
+            "00:00:00:00:00:01",
+            manufacturer_data={
+                ManufacturerData.company: PRODUCT_TYPE_MANUFACTURER_DATA
+            },
+        ),
+    ]
+    addresses = {"00:00:00:00:00:01", "00:00:00:00:00:02", "00:00:00:00:00:03"}
+    with patch(
+        "gardena_bluetooth.scan.BleakScanner", new=_mock_scanner(advertisements)
+    ):
+        async with DeviceProgress(addresses, timeout=0.1) as progress:
+            results = [result async for result in progress]
+
+        with pytest.raises(TimeoutError):
+            await async_get_devices(addresses, timeout=0.1)
+
+    assert [result.ble_device.address for result in results] == ["00:00:00:00:00:01"]
+    assert progress.timed_out
+    assert progress.pending == {"00:00:00:00:00:02", "00:00:00:00:00:03"}
+    assert progress.missing == {"00:00:00:00:00:03"}
+    assert progress.devices["00:00:00:00:00:02"].manufacturer_data.serial == 63005425
+
+
+def test_scan_options_passive_filters_company():
+    kwargs = SCAN_PASSIVE.scanner_kwargs()
+    assert kwargs["scanning_mode"] == "passive"
+    (pattern,) = kwargs["bluez"]["or_patterns"]
+    assert pattern.content_of_pattern == bytes.fromhex("2604")
+
+    kwargs = ScanOptions(service_uuids=(ScanService,)).scanner_kwargs()
+    assert kwargs == {"service_uuids": [ScanService]}
+
+
+async def test_hub_drops_addresses_not_requested():
+    callbacks = []
+    created = []
+
+    def _factory(*args, detection_callback, **kwargs):
+        callbacks.append(detection_callback)
+        created.append(kwargs)
+        scanner = MagicMock()
+        scanner.start = AsyncMock()
+        scanner.stop = AsyncMock()
+        return scanner
+
+    hub = ScannerHub.get(options=SCAN_PASSIVE)
+    assert ScannerHub.get() is not hub
+    with patch("gardena_bluetooth.scan.BleakScanner", new=_factory):
+        async with hub.consume({"00:00:00:00:00:01"}) as queue:
+            for address in ("00:00:00:00:00:01", "00:00:00:00:00:02"):
+                callbacks[0](
+                    *_advertisement(
+                        address,
+                        manufacturer_data={
+                            ManufacturerData.company: PRODUCT_TYPE_MANUFACTURER_DATA
+                        },
+                    )
+                )
+            assert queue.qsize() == 1
+
+    assert created[0]["scanning_mode"] == "passive"
+    assert "00:00:00:00:00:02" not in hub.devices
+
+
+def _counting_scanner(callbacks: list, starts: list):
+    def _factory(*args, detection_callback, **kwargs):
+        callbacks.append(detection_callback)
+        scanner = MagicMock()
+        scanner.start = AsyncMock(side_effect=lambda: starts.append(True))
+        scanner.stop = AsyncMock()
+        return scanner
+
+    return _factory
+
+
+def test_scheduler_learns_intervals():
+    hub = ScannerHub()
+    scheduler = ScanScheduler(hub, freshness=60.0, min_window=2.0, margin=2.0)
+    assert scheduler.window == 60.0
+
+    address = "00:00:00:00:00:01"
+    hub.devices.seen(address, 0.0)
+    for now in (0.0, 3.0, 6.0):
+        scheduler.observe(address, now)
+    assert scheduler.intervals[address] == 3.0
+    assert scheduler.window == 6.0
+
+    scheduler._begin_window()
+    scheduler.observe(address, 100.0)
+    scheduler.observe(address, 101.0)
+    assert scheduler.intervals[address] == 2.5
+
+
+async def test_scheduler_duty_cycles_and_pauses():
+    callbacks: list = []
+    starts: list = []
+    hub = ScannerHub()
+    scheduler = ScanScheduler(hub, freshness=0.1, min_window=0.02)
+    scheduler.intervals["00:00:00:00:00:01"] = 0.01
+    hub.devices.seen("00:00:00:00:00:01", 0.0)
+
+    with patch(
+        "gardena_bluetooth.scan.BleakScanner", new=_counting_scanner(callbacks, starts)
+    ):
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.25)
+        assert len(starts) >= 2
+
+        async with scheduler.paused():
+            assert not hub.running
+            count = len(starts)
+            await asyncio.sleep(0.15)
+            assert len(starts) == count
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    assert not hub.running
+
+
+async def test_scheduler_shares_hub_with_lookups():
+    callbacks: list = []
+    active: list[int] = [0, 0]
+
+    def _factory(*args, detection_callback, **kwargs):
+        callbacks.append(detection_callback)
+        scanner = MagicMock()
+
+        async def _start():
+            active[0] += 1
+            active[1] = max(active)
+
+        async def _stop():
+            active[0] -= 1
+
+        scanner.start = AsyncMock(side_effect=_start)
+        scanner.stop = AsyncMock(side_effect=_stop)
+        return scanner
+
+    address = "00:00:00:00:00:01"
+    hub = ScannerHub.get()
+    scheduler = ScanScheduler(hub, freshness=0.1, min_window=0.02)
+    scheduler.intervals["00:00:00:00:00:02"] = 0.01
+
+    with patch("gardena_bluetooth.scan.BleakScanner", new=_factory):
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.05)
+        assert not hub.running
+        assert ScannerHub.get() is hub
+
+        lookup = asyncio.create_task(async_get_devices({address}, timeout=1.0))
+        async with scheduler.paused():
+            await asyncio.sleep(0.05)
+            assert active[0] == 0
+            assert not lookup.done()
+
+        await asyncio.sleep(0)
+        assert hub.running
+        callbacks[-1](
+            *_advertisement(
+                address,
+                manufacturer_data={
+                    ManufacturerData.company: PRODUCT_TYPE_MANUFACTURER_DATA
+                },
+            )
+        )
+        devices = await lookup
+        assert devices[address].manufacturer_data.product_type is not None
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    assert active == [0, 1]
+    assert ScannerHub.get() is not hub
+
+
+async def test_get_devices_returns_known_from_hub():
+    callbacks: list = []
+    starts: list = []
+    address = "00:00:00:00:00:01"
+    hub = ScannerHub.get()
+    hub.acquire()
+    try:
+        with patch(
+            "gardena_bluetooth.scan.BleakScanner",
+            new=_counting_scanner(callbacks, starts),
+        ):
+            async with hub.consume():
+                callbacks[0](
+                    *_advertisement(
+                        address,
+                        manufacturer_data={
+                            ManufacturerData.company: PRODUCT_TYPE_MANUFACTURER_DATA
+                        },
+                    )
+                )
+            devices = await async_get_devices({address}, timeout=0.1)
+    finally:
+        hub.release()
+
+    assert devices[address] is hub.results.get(address)
+    assert len(starts) == 1
+
+
+async def test_refresh_errors_logged_and_cancelled(caplog):
+    address = "00:00:00:00:00:01"
+    cache = ManufacturerDataCache()
+    cache.update(address, ManufacturerData.decode(PRODUCT_TYPE_MANUFACTURER_DATA))
+
+    def _failing(*args, detection_callback, **kwargs):
+        scanner = MagicMock()
+        scanner.start = AsyncMock(side_effect=RuntimeError("adapter gone"))
+        scanner.stop = AsyncMock()
+        return scanner
+
+    with patch("gardena_bluetooth.scan.BleakScanner", new=_failing):
+        await async_get_manufacturer_data({address}, cache=cache)
+        await asyncio.gather(*scan._background_tasks)
+    assert "Failed to refresh cached devices" in caplog.text
+
+    with patch("gardena_bluetooth.scan.BleakScanner", new=_mock_scanner([])):
+        await async_get_manufacturer_data({address}, cache=cache)
+        (task,) = scan._background_tasks
+        await asyncio.sleep(0)
+        await scan.async_cancel_refresh()
+    assert task.cancelled()
+    assert not scan._background_tasks
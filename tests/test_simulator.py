@@ -0,0 +1,148 @@
+import pytest
+from bleak.exc import BleakError
+
+from gardena_bluetooth.client import DEFAULT_DELAY, CachedConnection, Client
+from gardena_bluetooth.const import SMP, Battery, Valve, Valve1
+from gardena_bluetooth.exceptions import CommunicationFailure
+from gardena_bluetooth.parse import ManufacturerData, ProductType
+from gardena_bluetooth.simulator import Faults, SimulatedDevice, connect_simulated
+
+
+def _client(device: SimulatedDevice) -> tuple[CachedConnection, Client]:
+    connection = CachedConnection(
+        DEFAULT_DELAY, lambda: device.ble_device, connector=connect_simulated
+    )
+    return connection, Client(connection, device.product_type)
+
+
+@pytest.mark.parametrize("product_type", list(ProductType)[1:])
+def test_simulated_device_advertises_product_type(product_type):
+    device = SimulatedDevice("00:00:00:00:00:01", product_type, serial=1234)
+    _, advertisement = device.advertisement()
+    manufacturer_data = ManufacturerData.decode(
+        advertisement.manufacturer_data[ManufacturerData.company]
+    )
+    assert manufacturer_data.product_type == product_type
+    assert manufacturer_data.serial == 1234
+
+
+async def test_simulated_device_read_write_notify():
+    device = SimulatedDevice("00:00:00:00:00:01", ProductType.WATER_COMPUTER)
+    connection, client = _client(device)
+
+    assert await client.read_char(Battery.battery_level) == 42
+    await client.write_char(Valve.remaining_open_time, 600)
+    assert await client.read_char(Valve.remaining_open_time) == 600
+    assert device.reads == 2
+    assert device.writes == 1
+
+    values = []
+    cleanup = await client.subscribe_char(Valve.state, values.append)
+    device.set_value(Valve.state.uuid, b"\x00")
+    await cleanup()
+    device.set_value(Valve.state.uuid, b"\x01")
+    assert values == [False]
+
+    await connection.disconnect()
+    assert not device.clients
+
+
+async def test_simulated_client_limits_write_to_mtu():
+    device = SimulatedDevice("00:00:00:00:00:01", ProductType.VALVE, mtu=23)
+    client = await connect_simulated(device.ble_device)
+    with pytest.raises(BleakError):
+        await client.write_gatt_char(Valve.state.uuid, bytes(21), response=False)
+    await client.write_gatt_char(Valve.state.uuid, bytes(21), response=True)
+
+
+async def test_simulated_connect_error_then_recovery():
+    device = SimulatedDevice(
+        "00:00:00:00:00:01", ProductType.VALVE, faults=Faults(connect_error=1.0)
+    )
+    connection, client = _client(device)
+
+    with pytest.raises(CommunicationFailure):
+        await client.read_char(Valve.state)
+    assert connection._client is None
+    assert device.injected == {"connect_error": 1}
+
+    device.faults = Faults()
+    assert await client.read_char(Valve.state) is True
+    await connection.disconnect()
+
+
+async def test_simulated_disconnect_during_read_reconnects():
+    device = SimulatedDevice(
+        "00:00:00:00:00:01",
+        ProductType.VALVE,
+        latency=0.001,
+        faults=Faults(disconnect=1.0),
+    )
+    connection, client = _client(device)
+
+    with pytest.raises(CommunicationFailure):
+        await client.read_char(Valve.state)
+    assert device.reads == 0
+    assert not device.clients
+
+    device.faults = Faults()
+    assert await client.read_char(Valve.state) is True
+    assert device.connects == 2
+    await connection.disconnect()
+
+
+async def test_simulated_notification_drop():
+    device = SimulatedDevice(
+        "00:00:00:00:00:01", ProductType.VALVE, faults=Faults(notification_drop=1.0)
+    )
+    connection, client = _client(device)
+
+    values = []
+    cleanup = await client.subscribe_char(Valve.state, values.append)
+    device.set_value(Valve.state.uuid, b"\x00")
+    assert values == []
+    assert device.injected == {"notification_drop": 1}
+    await cleanup()
+    await connection.disconnect()
+
+
+def test_simulated_faults_are_repeatable():
+    def draws(seed):
+        device = SimulatedDevice(
+            "00:00:00:00:00:01",
+            ProductType.VALVE,
+            faults=Faults(disconnect=0.5),
+            seed=seed,
+        )
+        return [device._inject("disconnect", 0.5) for _ in range(20)]
+
+    assert draws(1) == draws(1)
+    assert draws(None) == draws("00:00:00:00:00:01")
+
+
+@pytest.mark.parametrize("product_type", list(ProductType)[1:])
+async def test_simulated_device_reads_every_service(product_type):
+    device = SimulatedDevice("00:00:00:00:00:01", product_type)
+    client = await connect_simulated(device.ble_device)
+    for service in device.services:
+        char = service.characteristics[0]
+        assert await client.read_gatt_char(char) == device.values[char.handle]
+    assert device.reads == len(device.services.services)
+
+
+async def test_simulated_device_normalizes_uuids():
+    device = SimulatedDevice("00:00:00:00:00:01", ProductType.VALVE)
+    connection, client = _client(device)
+
+    assert SMP.smp.uuid != SMP.smp.uuid.lower()
+    assert await client.read_char_raw(SMP.smp.uuid) == device.value(SMP.smp.uuid)
+    await connection.disconnect()
+
+
+def test_simulated_device_keeps_values_per_handle():
+    device = SimulatedDevice("00:00:00:00:00:01", ProductType.WATER_COMPUTER)
+    handles = device.handles(Valve1.available.uuid)
+    assert len(handles) == 2
+
+    device.values[handles[0]] = b"\x00"
+    assert device.values[handles[1]] == b"\x01"